@@ -0,0 +1,280 @@
+''' ~*~{O}~*~
+	rssAdmin.py
+	Comment:
+		Bulk edits to the feed list: adding and removing feeds, changing
+		their class or urgency, reverting their timestamps, and importing or
+		exporting OPML. Every edit goes through a FeedListEditor, which loads
+		the store once, looks feeds up by url in a dict (so an edit costs the
+		same with 50 feeds or 50,000), and saves once when it's done.
+
+		with FeedListEditor("feeds.txt") as editor:
+			editor.addFeed("https://example.com/feed", "news")
+			editor.setUrgency("https://example.org/rss", 2)
+			editor.revertFeeds("2016-03-08 00:00:00", "news")
+
+		applyBatch() does the same from a file of commands, one per line:
+			add URL [CLASS [URGENCY]]
+			remove URL
+			class URL CLASS
+			urgency URL URGENCY
+			revert [DATE [CLASS]]
+		Quote anything with spaces in it (ie. revert "2016-03-08 00:00:00").
+		Blank lines and lines starting with # are skipped.
+
+	NOTE: nothing is written until save() (or the end of the with block),
+		and then only if something changed. An exception inside the with
+		block leaves the store as it was.
+'''
+
+import shlex
+from xml.etree import ElementTree
+
+import rssStore
+
+URGENCIES = (0, 1, 2)
+
+class FeedListEditor:
+	#feedJSON from the store at filePath, plus feedIndex: url -> feedData.
+	#A url that's in the list twice is indexed (and edited) by its first
+	#feedData. Removed feeds stay in feedList until save() - dropping them
+	#one at a time would cost O(n) per removal.
+	def __init__(self, filePath):
+		self.filePath = filePath
+		self.feedJSON = rssStore.loadStore(filePath)
+		self.feedList = self.feedJSON.setdefault("feedList", [])
+		self.feedIndex = {}
+		for feedData in self.feedList:
+			self.feedIndex.setdefault(feedData.get("url", ""), feedData)
+		self.removedUrls = set()
+		self.changed = False
+
+	def getFeed(self, url):
+		#the feedData for url, or None.
+		return self.feedIndex.get(url)
+
+	def addFeed(self, url, feedClass="", urgency=1, title="", home=""):
+		#returns the new feedData, or None if the url is already in the list.
+		#the rest of the feed's data is filled in when it's first checked.
+		if url in self.feedIndex:
+			return None
+		feedData = {"url": url, "class": feedClass, "urgency": urgency}
+		if title != "":
+			feedData["title"] = title
+		if home != "":
+			feedData["url-home"] = home
+		self.feedList.append(feedData)
+		self.feedIndex[url] = feedData
+		self.changed = True
+		return feedData
+
+	def removeFeed(self, url):
+		#False if there's no such feed.
+		if self.feedIndex.pop(url, None) is None:
+			return False
+		self.removedUrls.add(url)
+		self.changed = True
+		return True
+
+	def setClass(self, url, feedClass):
+		return self.setField(url, "class", feedClass)
+
+	def setUrgency(self, url, urgency):
+		return self.setField(url, "urgency", urgency)
+
+	def setField(self, url, key, value):
+		#False if there's no such feed.
+		feedData = self.feedIndex.get(url)
+		if feedData is None:
+			return False
+		if feedData.get(key) != value:
+			feedData[key] = value
+			self.changed = True
+		return True
+
+	def revertFeeds(self, newDate="1970-01-01 00:00:00", feedClass=None):
+		#set the latest timestamp of every feed (of feedClass, if given) back
+		#to newDate, and forget the entries they've seen and their cache
+		#validators, so the next check really does look at everything since
+		#newDate. Returns how many feeds were reverted.
+		#(as with rewriteTimestamps(), a feed without a timestamp doesn't get
+		#one.)
+		count = 0
+		for feedData in self.feedIndex.values():
+			if feedClass is not None and feedData.get("class") != feedClass:
+				continue
+			if "latestTimeStamp" in feedData:
+				feedData["latestTimeStamp"] = newDate
+			for key in ("seenEntries", "etag", "modified"):
+				feedData.pop(key, None)
+			count = count + 1
+		if count > 0:
+			self.changed = True
+		return count
+
+	def importOPML(self, source, feedClass=""):
+		#add the feeds in an OPML file (a path or file object). A feed's class
+		#is its category, or else the title of the outline it's inside, or
+		#else feedClass. Returns (feeds added, feeds already in the list).
+		added = 0
+		skipped = 0
+		for url, title, home, opmlClass in readOPML(source):
+			if self.addFeed(url, opmlClass or feedClass, 1, title, home) is None:
+				skipped = skipped + 1
+			else:
+				added = added + 1
+		return (added, skipped)
+
+	def exportOPML(self, out, feedClass=None):
+		#write the feeds (of feedClass, if given) to out as OPML, with an
+		#outline for each class. Returns how many feeds were written.
+		feeds = [feedData for feedData in self.feedIndex.values() \
+			if feedClass is None or feedData.get("class") == feedClass]
+		writeOPML(out, feeds)
+		return len(feeds)
+
+	def save(self):
+		#write the store, if anything changed.
+		if not self.changed:
+			return
+		if len(self.removedUrls) > 0:
+			self.feedList[:] = [feedData for feedData in self.feedList \
+				if not feedData.get("url", "") in self.removedUrls or \
+				self.feedIndex.get(feedData.get("url", "")) is feedData]
+			self.removedUrls = set()
+		rssStore.saveStore(self.filePath, self.feedJSON)
+		self.changed = False
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exceptionType, *exception):
+		if exceptionType is None:
+			self.save()
+#*** END OF FeedListEditor ****************************************************
+
+
+#>>> OPML <<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<
+def readOPML(source):
+	#[(url, title, home page, class)] for every outline with an xmlUrl.
+	try:
+		body = ElementTree.parse(source).getroot().find("body")
+	except (OSError, ElementTree.ParseError) as error:
+		raise RuntimeError("Couldn't read OPML: %s" % error)
+	if body is None:
+		raise RuntimeError("Couldn't read OPML: it has no <body>")
+	return getOPMLFeeds(body, "")
+#*** END OF readOPML() ********************************************************
+
+
+def getOPMLFeeds(parent, parentClass):
+	feeds = []
+	for outline in parent.findall("outline"):
+		title = outline.get("title") or outline.get("text") or ""
+		url = (outline.get("xmlUrl") or "").strip()
+		if url == "":
+			#a folder of feeds - its title is their class.
+			feeds.extend(getOPMLFeeds(outline, title or parentClass))
+			continue
+		#category is a comma separated list of /paths. Use the first.
+		category = (outline.get("category") or "").split(",")[0].strip("/ ")
+		feeds.append((url, title, outline.get("htmlUrl") or "", \
+			category or parentClass))
+	return feeds
+#*** END OF getOPMLFeeds() ****************************************************
+
+
+def writeOPML(out, feeds):
+	#OPML 2.0, with the feeds of each class in an outline named after it
+	#(classes in the order they're first seen). Feeds without a class go at
+	#the top level.
+	root = ElementTree.Element("opml", version="2.0")
+	head = ElementTree.SubElement(root, "head")
+	ElementTree.SubElement(head, "title").text = "rssMonitor feeds"
+	body = ElementTree.SubElement(root, "body")
+	folders = {}
+	for feedData in feeds:
+		feedClass = feedData.get("class", "")
+		parent = body
+		if feedClass != "":
+			if not feedClass in folders:
+				folders[feedClass] = ElementTree.SubElement(body, "outline", \
+					text=feedClass, title=feedClass)
+			parent = folders[feedClass]
+		parent.append(getOPMLOutline(feedData))
+	ElementTree.indent(root, "\t")
+	ElementTree.ElementTree(root).write(out, encoding="unicode", \
+		xml_declaration=True)
+	out.write("\n")
+#*** END OF writeOPML() *******************************************************
+
+
+def getOPMLOutline(feedData):
+	title = feedData.get("title", "") or feedData.get("url", "")
+	outline = ElementTree.Element("outline", type="rss", text=title, \
+		title=title, xmlUrl=feedData.get("url", ""))
+	if feedData.get("url-home", "") != "":
+		outline.set("htmlUrl", feedData["url-home"])
+	return outline
+#*** END OF getOPMLOutline() **************************************************
+
+
+#>>> BATCHES <<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<
+def applyBatch(editor, lines):
+	#apply the commands in lines (see the top of this file) to editor.
+	#Every line is checked before any of them are applied, so a mistake on
+	#line 900 doesn't leave the first 899 half done. Returns a list of
+	#warnings (ie. "remove" of a feed that isn't there).
+	warnings = []
+	for number, command, arguments in getBatchCommands(lines):
+		url = arguments[0] if len(arguments) > 0 else ""
+		if command == "add":
+			feedClass = arguments[1] if len(arguments) > 1 else ""
+			urgency = int(arguments[2]) if len(arguments) > 2 else 1
+			done = editor.addFeed(url, feedClass, urgency) is not None
+		elif command == "remove":
+			done = editor.removeFeed(url)
+		elif command == "class":
+			done = editor.setClass(url, arguments[1])
+		elif command == "urgency":
+			done = editor.setUrgency(url, int(arguments[1]))
+		else:
+			editor.revertFeeds(*arguments)
+			done = True
+		if not done:
+			warnings.append("line %i: %s %s did nothing" % (number, command, url))
+	return warnings
+#*** END OF applyBatch() ******************************************************
+
+
+def getBatchCommands(lines):
+	#[(line number, command, arguments)], or RuntimeError for the first line
+	#that doesn't make sense.
+	#command -> (fewest arguments, most arguments)
+	argumentCounts = {"add": (1, 3), "remove": (1, 1), "class": (2, 2), \
+		"urgency": (2, 2), "revert": (0, 2)}
+	commands = []
+	for number, line in enumerate(lines, 1):
+		try:
+			words = shlex.split(line, comments=True)
+		except ValueError as error:
+			raise RuntimeError("line %i: %s" % (number, error))
+		if len(words) == 0:
+			continue
+		command, arguments = words[0], words[1:]
+		if not command in argumentCounts:
+			raise RuntimeError("line %i: unknown command %s" % (number, command))
+		fewest, most = argumentCounts[command]
+		if not fewest <= len(arguments) <= most:
+			raise RuntimeError("line %i: %s takes %i to %i arguments" % \
+				(number, command, fewest, most))
+		urgency = None
+		if command == "add" and len(arguments) == 3:
+			urgency = arguments[2]
+		elif command == "urgency":
+			urgency = arguments[1]
+		if urgency is not None and \
+			not urgency in [str(value) for value in URGENCIES]:
+			raise RuntimeError("line %i: bad urgency %s" % (number, urgency))
+		commands.append((number, command, arguments))
+	return commands
+#*** END OF getBatchCommands() ************************************************
@@ -0,0 +1,202 @@
+''' ~*~{O}~*~
+	rssArchive.py
+	Comment:
+		Every new entry rssMonitor.py finds, kept for good. The feed store
+		only remembers enough to tell new entries from old ones, so without
+		this "what did that feed post last month" means hoping the feed still
+		carries it.
+
+		EntryArchive is an SQLite database next to the feed store
+		("feeds.txt.archive.db", see getArchivePath) with one row per entry:
+		its feed, title, link, a plain text summary and when it was posted.
+		An FTS5 index covers the titles and summaries. It's an external
+		content index, so the text is only stored once, and it keeps extra
+		indexes of 2 and 3 character prefixes so "prefix*" searches are quick.
+
+		A sharded store (see rssShard.py) has an archive per shard, ie.
+		"feeds.shard0of4.txt.archive.db". getArchivePaths finds them next to
+		the main store and searchArchives searches them all as one.
+
+	USAGE:
+		python rssCli.py search [TEXT] [--feed URL] [--class CLASS]
+			[--since DATE] [--until DATE] [--limit N] [--rank] [--json]
+
+		TEXT is an FTS5 query: words (all must match), "a phrase", OR,
+		NOT, prefix*, title:word... Results are newest first unless --rank
+		asks for the best matches first.
+
+	NOTE: newest first is the fast order. FTS5 hands back matches in rowid
+		order, so the first N are found without looking at the rest. --rank
+		has to score every match before it can pick the best N.
+'''
+
+import glob, sqlite3, time
+from os import path
+
+#what getArchivePath() adds to the feed store's path.
+ARCHIVE_SUFFIX = ".archive.db"
+
+def getArchivePath(storePath):
+	return storePath + ARCHIVE_SUFFIX
+#*** END OF getArchivePath() **************************************************
+
+
+def getArchivePaths(storePath):
+	#the store's own archive and those of any shards of it (named the way
+	#rssShard.getShardPath names them), whichever exist. If none do it's
+	#just the store's own, so opening it says there's no archive yet.
+	root, extension = path.splitext(storePath)
+	paths = [getArchivePath(storePath)] if \
+		path.exists(getArchivePath(storePath)) else []
+	paths.extend(sorted(glob.glob(glob.escape(root) + ".shard*of*" + \
+		glob.escape(extension) + ARCHIVE_SUFFIX)))
+	return paths or [getArchivePath(storePath)]
+#*** END OF getArchivePaths() *************************************************
+
+
+def searchArchives(filePaths, text="", feed=None, feedClass=None, \
+	since=None, until=None, limit=20, byRank=False):
+	#EntryArchive.search() over several archives at once: the best limit
+	#entries of each, merged newest found first or best ranked first.
+	#(ranks come from each archive's own word counts, so across archives
+	#they're close rather than exact.)
+	entries = []
+	for filePath in filePaths:
+		archive = EntryArchive(filePath, create=False)
+		try:
+			entries.extend(archive.search(text, feed, feedClass, since, until, \
+				limit, byRank))
+		finally:
+			archive.close()
+	if len(filePaths) > 1 and text != "" and byRank:
+		entries.sort(key=lambda entry: entry["rank"])
+	elif len(filePaths) > 1:
+		#(stable, so entries found together keep their archive's order)
+		entries.sort(key=lambda entry: entry["found"], reverse=True)
+	return entries[:limit]
+#*** END OF searchArchives() **************************************************
+
+
+class EntryArchive:
+	#entryKey is the entry's id, link or title (the first it has), and an
+	#entry is only archived once per feed. updated is when the entry says it
+	#was posted, found is when we archived it (both "%Y-%m-%d %H:%M:%S").
+	#create=False raises RuntimeError if there's no archive yet instead of
+	#starting one.
+	SCHEMA = '''
+		CREATE TABLE IF NOT EXISTS entries (
+			id INTEGER PRIMARY KEY,
+			feed TEXT NOT NULL,
+			feedTitle TEXT,
+			class TEXT,
+			entryKey TEXT NOT NULL,
+			title TEXT NOT NULL,
+			link TEXT,
+			summary TEXT,
+			updated TEXT,
+			found TEXT NOT NULL);
+		CREATE UNIQUE INDEX IF NOT EXISTS entries_key ON entries (feed, entryKey);
+		CREATE INDEX IF NOT EXISTS entries_class ON entries (class);
+		CREATE VIRTUAL TABLE IF NOT EXISTS entries_text USING fts5 (
+			title, summary, content='entries', content_rowid='id',
+			prefix='2 3');
+		CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries
+		BEGIN
+			INSERT INTO entries_text (rowid, title, summary)
+				VALUES (new.id, new.title, new.summary);
+		END;
+	'''
+	COLUMNS = ("feed", "feedTitle", "class", "title", "link", "summary", \
+		"updated", "found")
+
+	def __init__(self, filePath, create=True):
+		self.filePath = filePath
+		if not create and not path.exists(filePath):
+			raise RuntimeError("There's no entry archive at %s yet." % filePath)
+		try:
+			self.connection = sqlite3.connect(filePath)
+			self.connection.execute("PRAGMA journal_mode=WAL")
+			#in WAL mode this only gives up the last commits on a power
+			#cut, never the database.
+			self.connection.execute("PRAGMA synchronous=NORMAL")
+			self.connection.executescript(self.SCHEMA)
+		except sqlite3.Error as error:
+			#(including an SQLite built without FTS5)
+			raise RuntimeError("Bad entry archive: %s" % str(error))
+
+	def addFeedResults(self, feedResults):
+		#archive the entries of some rssMonitor.FeedResults, all in one
+		#transaction. Entries already in the archive are left as they are.
+		#Returns how many were added.
+		found = time.strftime("%Y-%m-%d %H:%M:%S")
+		rows = []
+		for feedResult in feedResults:
+			#(oldest first, so ids go up with time)
+			for entry in reversed(feedResult.entries):
+				updated = None
+				if entry.updated_parsed is not None:
+					updated = time.strftime("%Y-%m-%d %H:%M:%S", \
+						entry.updated_parsed)
+				rows.append((feedResult.url, feedResult.title, \
+					feedResult.feedClass, entry.id or entry.link or entry.title, \
+					entry.title, entry.link, entry.summary, updated, found))
+		try:
+			before = self.connection.total_changes
+			with self.connection:
+				self.connection.executemany("INSERT OR IGNORE INTO entries " \
+					"(feed, feedTitle, class, entryKey, title, link, summary, " \
+					"updated, found) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+		except sqlite3.Error as error:
+			raise RuntimeError("Couldn't archive entries: %s" % str(error))
+		#(each insert also counts the trigger's insert into the index)
+		return (self.connection.total_changes - before) // 2
+
+	def search(self, text="", feed=None, feedClass=None, since=None, \
+		until=None, limit=20, byRank=False):
+		#a list of entries (dicts with COLUMNS as keys), newest first or, with
+		#byRank, best match first. text is an FTS5 query ("" matches
+		#everything). since and until compare against when the entry was
+		#posted (or found, if it doesn't say), so "2016-03" works too. Ranked
+		#entries also have their "rank" (lower is better).
+		if text != "":
+			query = "SELECT %s FROM entries_text JOIN entries " \
+				"ON entries.id = entries_text.rowid " \
+				"WHERE entries_text MATCH ?"
+			arguments = [text]
+		else:
+			query = "SELECT %s FROM entries WHERE 1"
+			arguments = []
+		columns = ["entries." + column for column in self.COLUMNS]
+		if text != "" and byRank:
+			columns.append("entries_text.rank")
+		query = query % ", ".join(columns)
+		for column, value, test in (("entries.feed", feed, "= ?"), \
+			("entries.class", feedClass, "= ?"), \
+			("coalesce(entries.updated, entries.found)", since, ">= ?"), \
+			("coalesce(entries.updated, entries.found)", until, "< ?")):
+			if value is not None:
+				query = query + " AND %s %s" % (column, test)
+				arguments.append(value)
+		if text != "" and byRank:
+			query = query + " ORDER BY entries_text.rank"
+		elif text != "":
+			query = query + " ORDER BY entries_text.rowid DESC"
+		else:
+			query = query + " ORDER BY entries.id DESC"
+		query = query + " LIMIT ?"
+		arguments.append(limit)
+
+		try:
+			return [dict(zip(self.COLUMNS + ("rank",), row)) for row in \
+				self.connection.execute(query, arguments)]
+		except sqlite3.OperationalError as error:
+			#mostly FTS5 query syntax
+			raise RuntimeError("Bad search: %s" % str(error))
+
+	def getCount(self):
+		return self.connection.execute("SELECT count(*) FROM entries") \
+			.fetchone()[0]
+
+	def close(self):
+		self.connection.close()
+#*** END OF EntryArchive ******************************************************
@@ -0,0 +1,522 @@
+''' ~*~{O}~*~
+	rssBenchmark.py
+	Comment:
+		Benchmarks for rssMonitor.py. Starts a local stand-in HTTP server
+		which serves generated feeds after an artificial delay, so fetching
+		can be timed without touching the internet.
+
+	USAGE:
+		python rssBenchmark.py [feeds] [latency] [workers...]
+		e.g. "python rssBenchmark.py 40 0.25 1 4 8 16"
+		
+		python rssBenchmark.py parse [feeds] [entries] [workers...]
+		times parsing alone in 1, 2, 4 and N (CPU count) processes.
+		e.g. "python rssBenchmark.py parse 200 100"
+		
+		python rssBenchmark.py suite [key=value...]
+		runs checkFeeds() end to end, twice (cold, then with every feed
+		answering 304), for each size of feed list and saves the results as
+		JSON. Keys (and defaults): feeds=10,1000,10000 entries=20 size=500
+		latency=0 format=rss|atom gzip=0|1 store=txt|db workers=8
+		out=benchmark.json
+		e.g. "python rssBenchmark.py suite feeds=10,1000 format=atom"
+		
+		python rssBenchmark.py compare [before.json] [after.json]
+		lines up the results of two suite runs.
+		
+		python rssBenchmark.py startup [feeds] [runs]
+		times how long "rssCli.py check --due" takes to start up and exit
+		when nothing is due, against plain interpreter start up and
+		importing rssMonitor (with and without feedparser).
+		
+		python rssBenchmark.py keys
+		checks that rssMonitor's stream parser and feedparser give every
+		entry of some awkward RSS 2.0, Atom and RDF feeds the same id, link
+		and key, and that a streamed check doesn't make the next full parse
+		report old entries as new. Exits with 1 if either fails.
+'''
+
+import contextlib, gzip, json, logging, multiprocessing, os, platform, resource
+import subprocess, sys, tempfile, threading, time
+from concurrent.futures import ProcessPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from os import path, remove
+
+import rssMonitor, rssMetrics, rssStore
+
+def main():
+	if len(sys.argv) > 1 and sys.argv[1] == "parse":
+		benchParseScaling(sys.argv[2:])
+		return
+	if len(sys.argv) > 1 and sys.argv[1] == "suite":
+		runSuite(sys.argv[2:])
+		return
+	if len(sys.argv) > 1 and sys.argv[1] == "compare":
+		compareResults(*sys.argv[2:4])
+		return
+	if len(sys.argv) > 1 and sys.argv[1] == "startup":
+		benchStartup(sys.argv[2:])
+		return
+	if len(sys.argv) > 1 and sys.argv[1] == "keys":
+		sys.exit(0 if checkStreamKeys() and checkStreamRing() else 1)
+	
+	feedCount = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+	latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.25
+	workerCounts = [int(arg) for arg in sys.argv[3:]] or [1, 4, 8, 16]
+
+	server = startFeedServer(latency)
+	try:
+		#(the directory takes the store's snapshot and archive with it)
+		with tempfile.TemporaryDirectory() as directory:
+			feedPath = writeFeedList(server, feedCount, directory)
+			print("%i feeds, %.2fs latency per request" % (feedCount, latency))
+			for workers in workerCounts:
+				elapsed = benchLoadFeeds(feedPath, workers)
+				print("workers=%-3i %7.2fs  %6.1f feeds/s" % \
+					(workers, elapsed, feedCount / elapsed))
+	finally:
+		server.shutdown()
+#*** END OF MAIN **************************************************************
+
+
+def benchLoadFeeds(feedPath, workers, hostLimit=0):
+	#time a single loadFeeds() run. hostLimit is off by default because every
+	#test feed lives on the same (local) host.
+	start = time.perf_counter()
+	rssMonitor.loadFeeds(feedPath, workers, hostLimit)
+	return time.perf_counter() - start
+#*** END OF benchLoadFeeds() **************************************************
+
+
+def benchParseScaling(arguments):
+	#time parsing (no network) of a batch of big feeds with rssMonitor's
+	#parseFeedBody() in 1, 2, 4 and N worker processes, against parsing them
+	#all in this process.
+	feedCount = int(arguments[0]) if len(arguments) > 0 else 200
+	entryCount = int(arguments[1]) if len(arguments) > 1 else 100
+	workerCounts = [int(arg) for arg in arguments[2:]] or \
+		sorted(set([1, 2, 4, os.cpu_count() or 1]))
+	
+	bodies = [makeFeed("feed-%i" % number, entryCount, 2000) \
+		for number in range(feedCount)]
+	headers = [{"content-type": "application/rss+xml"}] * feedCount
+	print("%i feeds, %i entries each, %.1f MiB in total" % \
+		(feedCount, entryCount, sum(map(len, bodies)) / 2 ** 20))
+	
+	start = time.perf_counter()
+	for body, header in zip(bodies, headers):
+		rssMonitor.parseFeedBody(body, header)
+	baseline = time.perf_counter() - start
+	print("in-process  %7.2fs" % baseline)
+	
+	for workers in workerCounts:
+		with ProcessPoolExecutor(max_workers=workers, \
+			mp_context=multiprocessing.get_context("spawn")) as pool:
+			#start (and warm up) every worker before the clock starts.
+			list(pool.map(rssMonitor.parseFeedBody, bodies[:workers], \
+				headers[:workers]))
+			start = time.perf_counter()
+			list(pool.map(rssMonitor.parseFeedBody, bodies, headers))
+			elapsed = time.perf_counter() - start
+		print("workers=%-3i %7.2fs  x%.2f" % (workers, elapsed, baseline / elapsed))
+#*** END OF benchParseScaling() ***********************************************
+
+
+def benchStartup(arguments):
+	#median wall time of each command over a number of fresh interpreters.
+	#the store has feedCount feeds, none of them due for a day.
+	feedCount = int(arguments[0]) if len(arguments) > 0 else 1000
+	runs = int(arguments[1]) if len(arguments) > 1 else 20
+	here = path.dirname(path.abspath(__file__))
+	
+	nextCheck = time.strftime("%Y-%m-%d %H:%M:%S", \
+		time.localtime(time.time() + 24 * 60 * 60))
+	with tempfile.TemporaryDirectory() as directory:
+		storePath = path.join(directory, "feeds.txt")
+		rssStore.saveStore(storePath, {"lastCheck": "", "feedList": [{"url": \
+			"http://127.0.0.1/feed/%i" % number, "nextCheck": nextCheck} \
+			for number in range(feedCount)]})
+		commands = [("python", ["-c", "pass"]), \
+			("import rssMonitor", ["-c", "import rssMonitor"]), \
+			("...and feedparser", ["-c", \
+				"import rssMonitor; rssMonitor.loadFeedparser()"]), \
+			("check --due", [path.join(here, "rssCli.py"), "--store", \
+				storePath, "check", "--due"])]
+		print("%i feeds, nothing due, median of %i runs" % (feedCount, runs))
+		for name, command in commands:
+			times = []
+			for run in range(runs):
+				start = time.perf_counter()
+				subprocess.run([sys.executable] + command, cwd=here, check=True)
+				times.append(time.perf_counter() - start)
+			print("%-20s %7.1f ms" % (name, sorted(times)[runs // 2] * 1000))
+#*** END OF benchStartup() ****************************************************
+
+
+#>>> PARSER AGREEMENT <<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<
+#feeds for checkStreamKeys(), by version. Between them they have relative and
+#non-permalink guids, xml:base on the feed, an entry and a link, Atom ids
+#with and without an html link, and RDF items with and without rdf:about.
+KEY_TEST_FEEDS = {
+	"rss20": b"""<?xml version="1.0"?>
+<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom"
+	xmlns:itunes="http://www.itunes.com/dtds/podcast-1.0.dtd">
+<channel><title>RSS</title><link>http://example.com/</link>
+<item><title>not a permalink</title><guid isPermaLink="false">12345</guid>
+	<link>/posts/1</link></item>
+<item><title>permalink guid</title><guid>posts/2</guid></item>
+<item><title>guid before link</title><guid>posts/3</guid>
+	<link>http://example.com/3?a=1&amp;b=2</link></item>
+<item xml:base="http://other.example.com/dir/"><title>xml:base</title>
+	<link>4</link><guid isPermaLink="false">tag:example.com,2016:4</guid>
+	</item>
+<item><title>extra links</title><itunes:title>Not the title</itunes:title>
+	<atom:link rel="self" href="/self/5"/><link>/posts/5</link></item>
+<item><title>Only a title</title></item>
+</channel></rss>""",
+	"atom10": b"""<?xml version="1.0"?>
+<feed xmlns="http://www.w3.org/2005/Atom" xml:base="http://example.com/blog/">
+<title>Atom</title><link href="/"/><id>urn:feed</id>
+<entry><title>both</title><id>urn:uuid:1</id><link href="posts/1"/></entry>
+<entry><title>no link</title><id>posts/2</id></entry>
+<entry xml:base="/other/"><title>entry base</title><id>3</id>
+	<link rel="alternate" type="text/html" href="3.html"/>
+	<link rel="enclosure" href="3.mp3"/></entry>
+<entry><title>link base</title><id>tag:example.com,2016:4</id>
+	<link xml:base="http://cdn.example.com/" href="4"/></entry>
+<entry><title>not html</title><id>urn:uuid:5</id>
+	<link type="application/atom+xml" href="5.atom"/></entry>
+</feed>""",
+	"rss10": b"""<?xml version="1.0"?>
+<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+	xmlns="http://purl.org/rss/1.0/">
+<channel rdf:about="http://example.com/"><title>RDF</title>
+	<link>http://example.com/</link></channel>
+<item rdf:about="posts/1"><title>about</title><link>posts/1</link></item>
+<item rdf:about="http://example.com/2"><title>absolute</title>
+	<link>http://example.com/2</link></item>
+<item><title>no about</title><link>posts/3</link></item>
+</rdf:RDF>""",
+}
+
+def checkStreamKeys(baseUrl="http://example.com/feeds/feed.xml"):
+	#parse each of KEY_TEST_FEEDS with rssMonitor.streamFeed() and with
+	#feedparser (as rssMonitor.downloadFeed() would) and compare every
+	#entry's id, link and key. Prints what differs and returns True if
+	#nothing did.
+	agreed = True
+	for version, body in KEY_TEST_FEEDS.items():
+		streamed = rssMonitor.streamFeed([body], set(), baseUrl)[1]
+		parsed = rssMonitor.parseFeedBody(body, \
+			{"content-location": baseUrl, "content-type": "application/xml"})
+		if streamed is None or streamed.version != parsed.version or \
+			len(streamed.entries) != len(parsed.entries):
+			print("%s: the feeds don't match at all" % version)
+			agreed = False
+			continue
+		mismatches = 0
+		for streamedEntry, parsedEntry in zip(streamed.entries, parsed.entries):
+			for field in ("id", "link"):
+				if getattr(streamedEntry, field) != getattr(parsedEntry, field):
+					print("%s: %s %r != %r (feedparser)" % (version, field, \
+						getattr(streamedEntry, field), \
+						getattr(parsedEntry, field)))
+					mismatches = mismatches + 1
+			if rssMonitor.getEntryKey(streamedEntry) != \
+				rssMonitor.getEntryKey(parsedEntry):
+				mismatches = mismatches + 1
+		print("%-7s %i entries, %s" % (version, len(parsed.entries), \
+			"%i mismatches" % mismatches if mismatches > 0 else "ok"))
+		agreed = agreed and mismatches == 0
+	return agreed
+#*** END OF checkStreamKeys() *************************************************
+
+
+def checkStreamRing(entryCount=300, newCount=2):
+	#a feed of entryCount entries is fully parsed, then gets newCount new
+	#ones which are streamed. Every entry the feed still serves must still
+	#be in the seen ring afterwards, or the next full parse (the parse
+	#fallback, STREAM_PARSE off...) reports it as new again. Prints the
+	#outcome and returns True if nothing would be.
+	def getBody(count):
+		items = "".join("<item><title>t%i</title><guid>http://example.com/%i" \
+			"</guid></item>" % (entry, entry) for entry \
+			in reversed(range(count)))
+		return ("<?xml version=\"1.0\"?><rss version=\"2.0\"><channel>" \
+			"<title>Ring</title>%s</channel></rss>" % items).encode("utf-8")
+	headers = {"content-type": "application/xml"}
+	feedData = rssMonitor.updateSeenEntries({}, \
+		rssMonitor.parseFeedBody(getBody(entryCount), headers))
+	body = getBody(entryCount + newCount)
+	streamed = rssMonitor.streamFeed([body], \
+		set(feedData["seenEntries"].split()))[1]
+	rssMonitor.updateSeenEntries(feedData, streamed)
+	seen = set(feedData["seenEntries"].split())
+	unseen = [entry.title for entry in \
+		rssMonitor.parseFeedBody(body, headers).entries \
+		if not rssMonitor.getEntryKey(entry) in seen]
+	print("ring    %i entries + %i streamed, %s" % (entryCount, newCount, \
+		"%s new again" % ", ".join(unseen) if len(unseen) > 0 else "ok"))
+	return len(unseen) == 0
+#*** END OF checkStreamRing() *************************************************
+
+
+#>>> END TO END SUITE <<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<
+#the suite's settings, overridden by key=value arguments.
+SUITE_DEFAULTS = {"feeds": "10,1000,10000", "entries": "20", "size": "500", \
+	"latency": "0", "format": "rss", "gzip": "0", "store": "txt", \
+	"workers": "8", "out": "benchmark.json"}
+
+def runSuite(arguments):
+	#time checkFeeds() against the stand-in server for each size of feed
+	#list: a cold run (every feed is new) and then a warm one (every feed
+	#answers 304). Each run gets a fresh process, so its peak RSS is its
+	#own. The results are printed and saved as JSON (see compareResults).
+	config = dict(SUITE_DEFAULTS)
+	for argument in arguments:
+		key, _, value = argument.partition("=")
+		if not key in config:
+			raise SystemExit("unknown setting: %s" % key)
+		config[key] = value
+	feedCounts = [int(count) for count in config["feeds"].split(",")]
+	workers = int(config["workers"])
+	
+	server = startFeedServer(float(config["latency"]), int(config["entries"]), \
+		int(config["size"]), config["format"], config["gzip"] == "1")
+	results = []
+	try:
+		for feedCount in feedCounts:
+			#everything a run leaves next to the store (its snapshot,
+			#journal, entry archive, SQLite's -wal/-shm...) goes with the
+			#directory.
+			with tempfile.TemporaryDirectory() as directory:
+				feedPath = writeFeedList(server, feedCount, directory, \
+					config["store"])
+				for run in ("cold", "warm"):
+					requests = server.requests
+					connections = server.connections
+					with ProcessPoolExecutor(max_workers=1, \
+						mp_context=multiprocessing.get_context("spawn")) as pool:
+						result = pool.submit(measureCheckFeeds, feedPath, \
+							workers).result()
+					result["feeds"] = feedCount
+					result["run"] = run
+					result["requests"] = server.requests - requests
+					result["connections"] = server.connections - connections
+					result["requestsPerSecond"] = result["requests"] / \
+						result["wallSeconds"]
+					printResult(result)
+					results.append(result)
+	finally:
+		server.shutdown()
+	
+	with open(config["out"], "w") as store:
+		json.dump({"revision": getRevision(), "python": platform.python_version(), \
+			"platform": platform.platform(), "cpus": os.cpu_count(), \
+			"started": time.strftime("%Y-%m-%dT%H:%M:%S"), "config": config, \
+			"results": results}, store, sort_keys=True, indent=4, \
+			separators=(',', ': '))
+	print("results saved to %s" % config["out"])
+#*** END OF runSuite() ********************************************************
+
+
+def measureCheckFeeds(feedPath, workers):
+	#(runs in a fresh process) one checkFeeds() run with rssMetrics on, so
+	#the time spent in each stage comes back with it. hostLimit is off and
+	#there's no deadline, so every feed is checked however long it takes.
+	#the log is still written (like a real run's), just not anywhere.
+	logging.basicConfig(filename=os.devnull, level=logging.INFO)
+	rssMetrics.enableMetrics()
+	start = time.perf_counter()
+	with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+		result = rssMonitor.checkFeeds(feedPath, workers=workers, hostLimit=0, \
+			deadline=0)
+	elapsed = time.perf_counter() - start
+	return {"wallSeconds": elapsed, "newEntries": result.totalTally, \
+		"notModified": result.notModified, "timedOut": result.timedOut, \
+		"duplicates": result.duplicates, \
+		"stages": dict(rssMetrics.metrics.stages), \
+		#KiB on Linux (macOS reports bytes)
+		"peakRSSKiB": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+#*** END OF measureCheckFeeds() ***********************************************
+
+
+def printResult(result):
+	stages = "  ".join(["%s %.2fs" % (stage, seconds) for stage, seconds \
+		in sorted(result["stages"].items())])
+	print("feeds=%-6i %-4s %8.2fs %9.1f req/s %6i conns %7.1f MiB  %s" % \
+		(result["feeds"], result["run"], result["wallSeconds"], \
+		result["requestsPerSecond"], result["connections"], \
+		result["peakRSSKiB"] / 1024, stages))
+#*** END OF printResult() *****************************************************
+
+
+def compareResults(beforePath="benchmark-before.json", \
+	afterPath="benchmark.json"):
+	#print the wall time and peak RSS of each run in two suite results side
+	#by side. Runs only in one of them are left out.
+	with open(beforePath) as store:
+		before = json.load(store)
+	with open(afterPath) as store:
+		after = json.load(store)
+	print("before: %s (%s)" % (before.get("revision"), before["started"]))
+	print("after:  %s (%s)" % (after.get("revision"), after["started"]))
+	
+	beforeRuns = {(result["feeds"], result["run"]): result \
+		for result in before["results"]}
+	for result in after["results"]:
+		old = beforeRuns.get((result["feeds"], result["run"]))
+		if old is None:
+			continue
+		print("feeds=%-6i %-4s %8.2fs -> %8.2fs  x%.2f  %7.1f -> %7.1f MiB" % \
+			(result["feeds"], result["run"], old["wallSeconds"], \
+			result["wallSeconds"], old["wallSeconds"] / result["wallSeconds"], \
+			old["peakRSSKiB"] / 1024, result["peakRSSKiB"] / 1024))
+#*** END OF compareResults() **************************************************
+
+
+def getRevision():
+	#the git commit being benchmarked, if there is one.
+	try:
+		return subprocess.run(["git", "rev-parse", "--short", "HEAD"], \
+			cwd=path.dirname(path.abspath(__file__)), capture_output=True, \
+			text=True, check=True).stdout.strip()
+	except (OSError, subprocess.CalledProcessError):
+		return None
+#*** END OF getRevision() *****************************************************
+
+
+#>>> STAND-IN FEED SERVER <<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<
+def makeFeed(name, entryCount=10, contentSize=0, feedFormat="rss"):
+	#build an RSS 2.0 (or, with feedFormat="atom", Atom) document. Entries
+	#are newest first, an hour apart, and each has contentSize bytes or so of
+	#(escaped) HTML as its description.
+	content = ("&lt;p&gt;" + "lorem ipsum " * (contentSize // 12 + 1))[:contentSize]
+	if feedFormat == "atom":
+		return makeAtomFeed(name, entryCount, content)
+	items = []
+	for number in range(entryCount):
+		stamp = time.strftime("%a, %d %b %Y %H:%M:%S GMT", \
+			time.gmtime(1458000000 - number * 3600))
+		items.append("<item><title>%s entry %i</title>"
+			"<link>http://example.com/%s/%i</link>"
+			"<guid>%s-%i</guid><pubDate>%s</pubDate>"
+			"<description>%s</description></item>" % \
+			(name, number, name, number, name, number, stamp, content))
+	return ('<?xml version="1.0" encoding="UTF-8"?>'
+		'<rss version="2.0"><channel><title>%s</title>'
+		'<link>http://example.com/%s</link>%s</channel></rss>' % \
+		(name, name, "".join(items))).encode("utf-8")
+#*** END OF makeFeed() ********************************************************
+
+
+def makeAtomFeed(name, entryCount, content):
+	#the Atom version of makeFeed().
+	entries = []
+	for number in range(entryCount):
+		stamp = time.strftime("%Y-%m-%dT%H:%M:%SZ", \
+			time.gmtime(1458000000 - number * 3600))
+		entries.append("<entry><title>%s entry %i</title>"
+			'<link href="http://example.com/%s/%i"/>'
+			"<id>urn:%s-%i</id><updated>%s</updated>"
+			'<summary type="html">%s</summary></entry>' % \
+			(name, number, name, number, name, number, stamp, content))
+	return ('<?xml version="1.0" encoding="UTF-8"?>'
+		'<feed xmlns="http://www.w3.org/2005/Atom"><title>%s</title>'
+		'<link href="http://example.com/%s"/><id>urn:%s</id>'
+		'<updated>2016-03-15T00:00:00Z</updated>%s</feed>' % \
+		(name, name, name, "".join(entries))).encode("utf-8")
+#*** END OF makeAtomFeed() ****************************************************
+
+
+class FeedHandler(BaseHTTPRequestHandler):
+	#serves makeFeed(path) after sleeping for the server's latency. The feeds
+	#never change, so the path doubles as the ETag. Connections are kept
+	#alive (and counted), and bodies are gzipped for clients that ask if the
+	#server's gzip is set.
+	protocol_version = "HTTP/1.1"
+	
+	def setup(self):
+		BaseHTTPRequestHandler.setup(self)
+		with self.server.lock:
+			self.server.connections = self.server.connections + 1
+	
+	def do_GET(self):
+		with self.server.lock:
+			self.server.requests = self.server.requests + 1
+		time.sleep(self.server.latency)
+		etag = '"%s"' % self.path
+		if self.headers.get("If-None-Match") == etag:
+			self.send_response(304)
+			self.send_header("ETag", etag)
+			self.send_header("Content-Length", "0")
+			self.end_headers()
+			return
+		body = makeFeed(self.path.strip("/").replace("/", "-"), \
+			self.server.entryCount, self.server.contentSize, \
+			self.server.feedFormat)
+		self.send_response(200)
+		self.send_header("Content-Type", "application/%s+xml" % \
+			self.server.feedFormat)
+		self.send_header("ETag", etag)
+		if self.server.gzip and "gzip" in self.headers.get("Accept-Encoding", ""):
+			body = gzip.compress(body, 1)
+			self.send_header("Content-Encoding", "gzip")
+		self.send_header("Content-Length", str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def log_message(self, format, *args):
+		#keep the benchmark output readable
+		pass
+#*** END OF FeedHandler *******************************************************
+
+
+class FeedServer(ThreadingHTTPServer):
+	#a deeper listen queue than the default 5, so a burst of connections
+	#from the fetching threads isn't turned away.
+	request_queue_size = 128
+	daemon_threads = True
+#*** END OF FeedServer ********************************************************
+
+
+def startFeedServer(latency=0.0, entryCount=10, contentSize=0, \
+	feedFormat="rss", compress=False):
+	#start the stand-in server on a free local port in a background thread.
+	#every feed it serves has entryCount entries of about contentSize bytes.
+	#server.requests and server.connections count what it has answered.
+	server = FeedServer(("127.0.0.1", 0), FeedHandler)
+	server.latency = latency
+	server.entryCount = entryCount
+	server.contentSize = contentSize
+	server.feedFormat = feedFormat
+	server.gzip = compress
+	server.lock = threading.Lock()
+	server.requests = 0
+	server.connections = 0
+	threading.Thread(target=server.serve_forever, daemon=True).start()
+	return server
+#*** END OF startFeedServer() *************************************************
+
+
+def writeFeedList(server, feedCount, directory, storeType="txt"):
+	#write a feeds.txt in directory pointing every feed at the server (or,
+	#with storeType="db", an SQLite feed store). Returns the path of the file.
+	base = "http://127.0.0.1:%i" % server.server_address[1]
+	feedJSON = {"feedList": [{"url": "%s/feed/%i" % (base, number)} \
+		for number in range(feedCount)]}
+	feedPath = path.join(directory, "feeds.txt")
+	with open(feedPath, "w") as store:
+		json.dump(feedJSON, store)
+	if storeType != "db":
+		return feedPath
+	
+	dbPath = path.join(directory, "feeds.db")
+	rssStore.migrateStore(feedPath, dbPath)
+	remove(feedPath)
+	return dbPath
+#*** END OF writeFeedList() ***************************************************
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,280 @@
+''' ~*~{O}~*~
+	rssCli.py
+	Comment:
+		The command line front end for rssMonitor.py, built to start quickly
+		from cron. Nothing heavy is imported until it's needed: "list" and
+		"add" only touch the feed store, and "check --due" reads when the
+		next feed is due from the store's snapshot (see rssStore.getNextDue)
+		and exits straight away if that's still in the future. rssMonitor.py
+		(and feedparser with it) is only imported once there's checking to do.
+		The commands that edit the feed list use rssAdmin.py, and load and
+		save the store once however many feeds they're given. "search" only
+		opens the entry archive (see rssArchive.py).
+
+	USAGE:
+		python rssCli.py [--store PATH] check [--due] [--jsonl TARGET]
+		python rssCli.py [--store PATH] list [--class CLASS] [--urgency N]
+			[--times]
+		python rssCli.py [--store PATH] revert [DATE] [--class CLASS]
+		python rssCli.py [--store PATH] add URL... [--class CLASS]
+			[--urgency N]
+		python rssCli.py [--store PATH] remove URL...
+		python rssCli.py [--store PATH] set URL... [--class CLASS]
+			[--urgency N]
+		python rssCli.py [--store PATH] import OPML [--class CLASS]
+		python rssCli.py [--store PATH] export [OPML] [--class CLASS]
+		python rssCli.py [--store PATH] batch FILE
+		python rssCli.py [--store PATH] search [TEXT] [--feed URL]
+			[--class CLASS] [--since DATE] [--until DATE] [--limit N]
+			[--rank] [--json]
+
+		e.g. "*/5 * * * * python rssCli.py check --due" in a crontab.
+		"-" for a FILE or OPML means stdin (or stdout, for export). See
+		rssAdmin.py for the commands a batch file can have.
+'''
+
+import argparse, sys, time
+from os import path
+
+import rssStore
+
+def main(arguments=None):
+	parser = argparse.ArgumentParser(prog="rssCli.py", \
+		description="Keeps track of RSS feeds.")
+	parser.add_argument("--store", default=getDefaultStorePath(), \
+		help="the feed store (default: feeds.txt next to this program)")
+	commands = parser.add_subparsers(dest="command", required=True)
+
+	check = commands.add_parser("check", help="check the feeds for new entries")
+	check.add_argument("--due", action="store_true", \
+		help="only the feeds that are due (for cron)")
+	check.add_argument("--jsonl", metavar="TARGET", help="write new entries " \
+		"as JSON Lines to TARGET (-, a file or unix:SOCKET)")
+
+	listing = commands.add_parser("list", help="list the feeds")
+	listing.add_argument("--class", dest="feedClass")
+	listing.add_argument("--urgency", type=int)
+	listing.add_argument("--times", action="store_true", \
+		help="show each feed's latest timestamp")
+
+	revert = commands.add_parser("revert", \
+		help="set every feed's latest timestamp back")
+	revert.add_argument("date", nargs="?", default="1970-01-01 00:00:00")
+	revert.add_argument("--class", dest="feedClass", \
+		help="only the feeds of this class")
+
+	add = commands.add_parser("add", help="add feeds")
+	add.add_argument("urls", metavar="URL", nargs="+")
+	add.add_argument("--class", dest="feedClass", default="")
+	add.add_argument("--urgency", type=int, default=1, choices=(0, 1, 2))
+
+	remove = commands.add_parser("remove", help="remove feeds")
+	remove.add_argument("urls", metavar="URL", nargs="+")
+
+	change = commands.add_parser("set", help="change feeds' class or urgency")
+	change.add_argument("urls", metavar="URL", nargs="+")
+	change.add_argument("--class", dest="feedClass")
+	change.add_argument("--urgency", type=int, choices=(0, 1, 2))
+
+	opmlImport = commands.add_parser("import", help="add the feeds in OPML")
+	opmlImport.add_argument("opml", metavar="OPML")
+	opmlImport.add_argument("--class", dest="feedClass", default="", \
+		help="for feeds the OPML doesn't give a class")
+
+	opmlExport = commands.add_parser("export", help="write the feeds as OPML")
+	opmlExport.add_argument("opml", metavar="OPML", nargs="?", default="-")
+	opmlExport.add_argument("--class", dest="feedClass")
+
+	batch = commands.add_parser("batch", help="apply a file of edits")
+	batch.add_argument("file", metavar="FILE")
+
+	search = commands.add_parser("search", help="search the archived entries")
+	search.add_argument("text", metavar="TEXT", nargs="?", default="", \
+		help="an FTS5 query (leave it out to match everything)")
+	search.add_argument("--feed", metavar="URL")
+	search.add_argument("--class", dest="feedClass")
+	search.add_argument("--since", metavar="DATE", \
+		help="posted on or after DATE (YYYY-MM-DD [HH:MM:SS])")
+	search.add_argument("--until", metavar="DATE", help="posted before DATE")
+	search.add_argument("--limit", type=int, default=20)
+	search.add_argument("--rank", action="store_true", \
+		help="best matches first instead of newest first")
+	search.add_argument("--json", action="store_true", \
+		help="one JSON object per entry")
+
+	options = parser.parse_args(arguments)
+	try:
+		return {"check": runCheck, "list": runList, "revert": runRevert, \
+			"add": runAdd, "remove": runRemove, "set": runSet, \
+			"import": runImport, "export": runExport, "batch": runBatch, \
+			"search": runSearch}[options.command](options)
+	except RuntimeError as error:
+		print("Fatal Error: %s" % error, file=sys.stderr)
+		return 1
+#*** END OF MAIN **************************************************************
+
+
+def getDefaultStorePath():
+	#the same default as rssMonitor.getStorePath().
+	return path.join(path.dirname(path.realpath(__file__)), "feeds.txt")
+#*** END OF getDefaultStorePath() *********************************************
+
+
+def isNothingDue(filePath):
+	#True only if the snapshot is current and says no feed is due yet.
+	nextDue = rssStore.getNextDue(filePath)
+	return nextDue is not None and \
+		nextDue > time.strftime("%Y-%m-%d %H:%M:%S")
+#*** END OF isNothingDue() ****************************************************
+
+
+#>>> COMMANDS <<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<
+def runCheck(options):
+	if options.due and isNothingDue(options.store):
+		return 0
+
+	import rssMonitor
+	if options.jsonl is not None:
+		rssMonitor.streamCheck(options.jsonl, options.store, options.due)
+	elif options.due:
+		output = rssMonitor.scheduledCheck(options.store)
+		if output != "":
+			print(output)
+	else:
+		rssMonitor.main(options.store)
+	return 0
+#*** END OF runCheck() ********************************************************
+
+
+def runList(options):
+	#"=== title" then the url (and latest timestamp) of each feed.
+	feedList = rssStore.getFeedStore(options.store).getFeedList( \
+		options.feedClass, options.urgency)
+	lines = []
+	for feedData in feedList:
+		lines.append("=== " + feedData.get("title", ""))
+		lines.append("\t" + feedData.get("url", ""))
+		if options.times:
+			lines.append("\t" + feedData.get("latestTimeStamp", "never"))
+	print("\n".join(lines))
+	return 0
+#*** END OF runList() *********************************************************
+
+
+def runRevert(options):
+	from rssAdmin import FeedListEditor
+	with FeedListEditor(options.store) as editor:
+		editor.revertFeeds(options.date, options.feedClass)
+	return 0
+#*** END OF runRevert() *******************************************************
+
+
+def runAdd(options):
+	from rssAdmin import FeedListEditor
+	status = 0
+	with FeedListEditor(options.store) as editor:
+		for url in options.urls:
+			if editor.addFeed(url, options.feedClass, options.urgency) is None:
+				print("Already have %s" % url, file=sys.stderr)
+				status = 1
+	return status
+#*** END OF runAdd() **********************************************************
+
+
+def runRemove(options):
+	from rssAdmin import FeedListEditor
+	status = 0
+	with FeedListEditor(options.store) as editor:
+		for url in options.urls:
+			if not editor.removeFeed(url):
+				print("No feed %s" % url, file=sys.stderr)
+				status = 1
+	return status
+#*** END OF runRemove() *******************************************************
+
+
+def runSet(options):
+	from rssAdmin import FeedListEditor
+	status = 0
+	with FeedListEditor(options.store) as editor:
+		for url in options.urls:
+			if editor.getFeed(url) is None:
+				print("No feed %s" % url, file=sys.stderr)
+				status = 1
+			if options.feedClass is not None:
+				editor.setClass(url, options.feedClass)
+			if options.urgency is not None:
+				editor.setUrgency(url, options.urgency)
+	return status
+#*** END OF runSet() **********************************************************
+
+
+def runImport(options):
+	from rssAdmin import FeedListEditor
+	with FeedListEditor(options.store) as editor:
+		source = sys.stdin if options.opml == "-" else options.opml
+		added, skipped = editor.importOPML(source, options.feedClass)
+	print("%i feeds added, %i already there." % (added, skipped), \
+		file=sys.stderr)
+	return 0
+#*** END OF runImport() *******************************************************
+
+
+def runExport(options):
+	from rssAdmin import FeedListEditor
+	editor = FeedListEditor(options.store)
+	if options.opml == "-":
+		editor.exportOPML(sys.stdout, options.feedClass)
+		return 0
+	try:
+		with open(options.opml, "w", encoding="utf-8") as out:
+			editor.exportOPML(out, options.feedClass)
+	except OSError as error:
+		raise RuntimeError("Couldn't write %s: %s" % (options.opml, error))
+	return 0
+#*** END OF runExport() *******************************************************
+
+
+def runBatch(options):
+	#every edit in the file, with one load and one save.
+	from rssAdmin import FeedListEditor, applyBatch
+	try:
+		if options.file == "-":
+			lines = sys.stdin.readlines()
+		else:
+			with open(options.file, encoding="utf-8") as batchFile:
+				lines = batchFile.readlines()
+	except OSError as error:
+		raise RuntimeError("Couldn't read %s: %s" % (options.file, error))
+	with FeedListEditor(options.store) as editor:
+		warnings = applyBatch(editor, lines)
+	for warning in warnings:
+		print(warning, file=sys.stderr)
+	return 0
+#*** END OF runBatch() ********************************************************
+
+
+def runSearch(options):
+	import json
+	from rssArchive import getArchivePaths, searchArchives
+	entries = searchArchives(getArchivePaths(options.store), options.text, \
+		options.feed, options.feedClass, options.since, options.until, \
+		options.limit, options.rank)
+	lines = []
+	for entry in entries:
+		if options.json:
+			lines.append(json.dumps(entry, sort_keys=True))
+			continue
+		lines.append("=== " + entry["title"])
+		lines.append("\t%s, %s" % (entry["feedTitle"] or entry["feed"], \
+			entry["updated"] or entry["found"]))
+		if entry["link"]:
+			lines.append("\t" + entry["link"])
+	if len(lines) > 0:
+		print("\n".join(lines))
+	return 0
+#*** END OF runSearch() *******************************************************
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,503 @@
+''' ~*~{O}~*~
+	rssFetch.py
+	Comment:
+		The HTTP client rssMonitor.py downloads feeds with. One FeedFetcher
+		is shared by every fetching thread (see getFetcher), so feeds on the
+		same host reuse a kept-alive connection instead of paying for a new
+		TCP (and TLS) handshake each time. Host names are looked up once per
+		DNS_CACHE_SECONDS, and bodies are asked for gzip/deflate compressed
+		(and brotli, if the brotli module is installed) and decompressed as
+		they're read. feedparser only ever sees the finished bytes.
+
+		Like urllib, it goes through the proxies in http_proxy/https_proxy
+		(minus no_proxy) - https by a CONNECT tunnel - and a url with a
+		user:password@ in it is fetched with basic authentication. It only
+		fetches http and https: rssMonitor.py leaves anything else (file://
+		and so on) to feedparser.
+
+		TokenBucket and CircuitBreaker are the per-host limits rssMonitor.py
+		fetches under: the first spaces out requests to one host, the second
+		stops asking a host that keeps failing for a while.
+
+	NOTE: a response has to be read to the end for its connection to go
+		back in the pool. One that's closed early (ie. by streamFeed)
+		closes its connection instead.
+'''
+
+import base64, http.client, socket, ssl, threading, time, zlib
+from urllib.parse import urlsplit, urljoin, unquote
+from urllib.request import getproxies, proxy_bypass
+
+try:
+	import brotli
+except ImportError:
+	#optional - without it we just don't ask for br.
+	brotli = None
+
+#idle connections kept per host, how long a looked-up address is trusted,
+#and how many redirects one fetch follows.
+MAX_IDLE_PER_HOST = 8
+DNS_CACHE_SECONDS = 300
+MAX_REDIRECTS = 5
+
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+#requests a second each host gets on average, and how many it can get in a
+#burst before that kicks in (see TokenBucket).
+HOST_RATE = 5.0
+HOST_BURST = 10
+
+#failures in a row before a host's circuit breaker opens, how many seconds
+#it stays open the first time, and the longest it can stay open. Each time
+#it opens again without a success in between, it stays open twice as long.
+BREAKER_FAILURES = 3
+BREAKER_COOLDOWN = 5 * 60
+BREAKER_MAX_COOLDOWN = 24 * 60 * 60
+
+#the shared FeedFetcher (see getFetcher())
+fetcher = None
+fetcherLock = threading.Lock()
+
+def getFetcher():
+	#returns the FeedFetcher every thread shares, starting it if need be.
+	global fetcher
+	with fetcherLock:
+		if fetcher is None:
+			fetcher = FeedFetcher()
+		return fetcher
+#*** END OF getFetcher() ******************************************************
+
+
+def getAcceptEncoding():
+	if brotli is None:
+		return "gzip, deflate"
+	return "gzip, deflate, br"
+#*** END OF getAcceptEncoding() ***********************************************
+
+
+#>>> FETCHING <<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<
+class FeedFetcher:
+	#a pool of kept-alive connections, by (scheme, host, port, proxy). Every
+	#method is safe to call from several threads at once.
+	#proxies is {scheme: proxy url}, read from the environment (as urllib
+	#does) unless it's given.
+	def __init__(self, maxIdle=MAX_IDLE_PER_HOST, proxies=None):
+		self.maxIdle = maxIdle
+		self.idle = {}
+		self.lock = threading.Lock()
+		self.sslContext = ssl.create_default_context()
+		self.proxies = getproxies() if proxies is None else proxies
+
+	def fetch(self, url, headers=None, timeout=10):
+		#GET url, following redirects. Returns a FetchResponse for the
+		#last one, whatever its status. Raises OSError (timeouts included)
+		#if the host can't be reached and ValueError for urls we can't get.
+		redirects = []
+		while True:
+			connection, key, response = self.request(url, headers, timeout)
+			location = response.getheader("Location")
+			if not response.status in REDIRECT_STATUSES or location is None:
+				return FetchResponse(self, key, connection, response, url, \
+					redirects)
+			if len(redirects) == MAX_REDIRECTS:
+				connection.close()
+				raise ValueError("too many redirects from %s" % url)
+			#finish off the redirect's (usually tiny) body so the
+			#connection can be used again.
+			FetchResponse(self, key, connection, response, url).close(True)
+			url = urljoin(url, location)
+			redirects.append((response.status, url))
+
+	def request(self, url, headers, timeout):
+		#send the request on a pooled connection if there is one. A pooled
+		#connection the server has since dropped gets one retry on a new
+		#connection. Returns (connection, key, response).
+		parts = urlsplit(url)
+		if not parts.scheme in ("http", "https") or not parts.hostname:
+			raise ValueError("unknown url type: %s" % url)
+		port = parts.port or (443 if parts.scheme == "https" else 80)
+		proxy = self.getProxy(parts)
+		key = (parts.scheme, parts.hostname, port, proxy)
+		target = (parts.path or "/") + ("?" + parts.query if parts.query else "")
+		requestHeaders = {"Accept-Encoding": getAcceptEncoding()}
+		if parts.username is not None:
+			requestHeaders["Authorization"] = getBasicAuth(parts.username, \
+				parts.password)
+		if proxy is not None and parts.scheme == "http":
+			#a proxy is asked for the whole url (https goes through a tunnel
+			#instead - see newConnection).
+			target = "http://%s%s" % (parts.netloc.rpartition("@")[2], target)
+			requestHeaders.update(getProxyHeaders(proxy))
+		requestHeaders.update(headers or {})
+
+		connection = self.acquire(key, timeout)
+		reused = connection.sock is not None
+		try:
+			connection.request("GET", target, headers=requestHeaders)
+			return (connection, key, connection.getresponse())
+		except (http.client.RemoteDisconnected, ConnectionResetError, \
+			BrokenPipeError):
+			connection.close()
+			if not reused:
+				raise
+		except http.client.HTTPException as error:
+			connection.close()
+			raise ConnectionError(str(error) or type(error).__name__)
+		except BaseException:
+			connection.close()
+			raise
+
+		connection = self.newConnection(key, timeout)
+		try:
+			connection.request("GET", target, headers=requestHeaders)
+			return (connection, key, connection.getresponse())
+		except http.client.HTTPException as error:
+			connection.close()
+			raise ConnectionError(str(error) or type(error).__name__)
+		except BaseException:
+			connection.close()
+			raise
+
+	def acquire(self, key, timeout):
+		#an idle connection for key if there is one, else a new one.
+		with self.lock:
+			pool = self.idle.get(key)
+			connection = pool.pop() if pool else None
+		if connection is None:
+			return self.newConnection(key, timeout)
+		connection.timeout = timeout
+		connection.sock.settimeout(timeout)
+		return connection
+
+	def newConnection(self, key, timeout):
+		scheme, host, port, proxy = key
+		if proxy is None:
+			if scheme == "https":
+				return PooledHTTPSConnection(host, port, timeout=timeout, \
+					context=self.sslContext)
+			return PooledHTTPConnection(host, port, timeout=timeout)
+		
+		proxyParts = urlsplit(proxy)
+		proxyPort = proxyParts.port or 80
+		if scheme == "https":
+			connection = PooledHTTPSConnection(proxyParts.hostname, proxyPort, \
+				timeout=timeout, context=self.sslContext)
+			connection.set_tunnel(host, port, getProxyHeaders(proxy))
+			return connection
+		return PooledHTTPConnection(proxyParts.hostname, proxyPort, \
+			timeout=timeout)
+
+	def getProxy(self, parts):
+		#the proxy url to fetch urlsplit() parts through, or None to go
+		#straight to the host.
+		proxy = self.proxies.get(parts.scheme)
+		if not proxy or proxy_bypass(parts.hostname):
+			return None
+		if not "://" in proxy:
+			proxy = "http://" + proxy
+		return proxy
+
+	def release(self, key, connection):
+		#put a connection whose last response has been read back in the pool.
+		with self.lock:
+			pool = self.idle.setdefault(key, [])
+			if len(pool) < self.maxIdle:
+				pool.append(connection)
+				return
+		connection.close()
+
+	def close(self):
+		#close every idle connection.
+		with self.lock:
+			pools = list(self.idle.values())
+			self.idle = {}
+		for pool in pools:
+			for connection in pool:
+				connection.close()
+#*** END OF FeedFetcher *******************************************************
+
+
+class FetchResponse:
+	#one response from FeedFetcher.fetch(). read() gives back the body
+	#already decompressed, and headers has its keys in lower case (minus
+	#content-encoding once that's been undone). url is where the response
+	#really came from and redirects is [(status, url)] for each hop taken
+	#to get there. Close it (or use "with") when you're done.
+	def __init__(self, fetcher, key, connection, response, url, redirects=()):
+		self.fetcher = fetcher
+		self.key = key
+		self.connection = connection
+		self.response = response
+		self.url = url
+		self.redirects = list(redirects)
+		self.status = response.status
+		self.reason = response.reason
+		self.headers = {name.lower(): value for name, value \
+			in response.getheaders()}
+		try:
+			self.decoder = getDecoder(self.headers.pop("content-encoding", ""))
+		except ValueError:
+			connection.close()
+			raise
+
+	def read(self, size=65536):
+		#up to size bytes of the (decompressed) body, b"" at the end.
+		#a body that won't decompress raises ValueError.
+		try:
+			return self.readDecoded(size)
+		except zlib.error as error:
+			raise ValueError("bad %s body: %s" % (self.key[1], error))
+
+	def readDecoded(self, size):
+		while True:
+			data = self.response.read(size)
+			if self.decoder is None:
+				return data
+			if not data:
+				data = self.decoder.flush()
+				self.decoder = None
+				return data
+			data = self.decoder.decompress(data)
+			if data:
+				return data
+
+	def close(self, drain=False):
+		#a connection is only reusable once its response has been read to
+		#the end. drain reads whatever is left first.
+		if self.connection is None:
+			return
+		try:
+			if drain:
+				self.response.read()
+		except (OSError, http.client.HTTPException):
+			pass
+		if self.response.isclosed() and not self.response.will_close:
+			self.fetcher.release(self.key, self.connection)
+		else:
+			self.response.close()
+			self.connection.close()
+		self.connection = None
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exception):
+		self.close()
+#*** END OF FetchResponse *****************************************************
+
+
+def getBasicAuth(username, password):
+	#an Authorization header for the user:password@ part of a url.
+	credentials = "%s:%s" % (unquote(username), unquote(password or ""))
+	return "Basic " + base64.b64encode(credentials.encode("utf-8")) \
+		.decode("ascii")
+#*** END OF getBasicAuth() ****************************************************
+
+
+def getProxyHeaders(proxy):
+	#the headers a request through proxy needs (its credentials, if it has
+	#any).
+	parts = urlsplit(proxy)
+	if parts.username is None:
+		return {}
+	return {"Proxy-Authorization": getBasicAuth(parts.username, \
+		parts.password)}
+#*** END OF getProxyHeaders() *************************************************
+
+
+#>>> HOST LIMITS <<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<
+class TokenBucket:
+	#lets through rate requests a second on average, and up to burst at once
+	#after a quiet spell. Safe to share between threads: a token that isn't
+	#there yet is reserved, so waiting threads queue up instead of all
+	#waking at once.
+	def __init__(self, rate=HOST_RATE, burst=HOST_BURST):
+		self.rate = rate
+		self.burst = burst
+		self.tokens = float(burst)
+		self.updated = time.monotonic()
+		self.lock = threading.Lock()
+
+	def acquire(self, deadlineAt=None):
+		#take a token, sleeping until there is one. Returns False (without
+		#taking one) if that would be after deadlineAt (a time.monotonic()).
+		with self.lock:
+			now = time.monotonic()
+			self.tokens = min(self.burst, \
+				self.tokens + (now - self.updated) * self.rate)
+			self.updated = now
+			wait = max(0.0, (1 - self.tokens) / self.rate)
+			if deadlineAt is not None and now + wait > deadlineAt:
+				return False
+			self.tokens = self.tokens - 1
+		if wait > 0:
+			time.sleep(wait)
+		return True
+#*** END OF TokenBucket *******************************************************
+
+
+class CircuitBreaker:
+	#counts a host's failures in a row. After maxFailures of them it opens:
+	#allow() is False until openUntil (a time.time()), cooldown seconds away
+	#the first time and twice as long each time it opens again (trips) until
+	#something succeeds. Once openUntil has passed, requests are let through
+	#again - a success closes the breaker, a failure opens it straight back
+	#up. failCount, trips and openUntil are all there is to save.
+	def __init__(self, failCount=0, trips=0, openUntil=0.0, \
+		maxFailures=BREAKER_FAILURES, cooldown=BREAKER_COOLDOWN, \
+		maxCooldown=BREAKER_MAX_COOLDOWN):
+		self.failCount = failCount
+		self.trips = trips
+		self.openUntil = openUntil
+		self.maxFailures = maxFailures
+		self.cooldown = cooldown
+		self.maxCooldown = maxCooldown
+		self.lock = threading.Lock()
+
+	def allow(self):
+		return time.time() >= self.openUntil
+
+	def record(self, failed):
+		#note how a request to the host went.
+		with self.lock:
+			if not failed:
+				self.failCount = 0
+				self.trips = 0
+				self.openUntil = 0.0
+				return
+			self.failCount = self.failCount + 1
+			now = time.time()
+			#(requests already under way when it opened don't open it again)
+			if self.failCount >= self.maxFailures and now >= self.openUntil:
+				self.openUntil = now + min(self.cooldown * 2 ** self.trips, \
+					self.maxCooldown)
+				self.trips = self.trips + 1
+
+	def isClosed(self):
+		#True if the host has nothing against it.
+		return self.failCount == 0 and self.trips == 0
+#*** END OF CircuitBreaker ****************************************************
+
+
+#>>> CONNECTIONS <<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<
+class PooledHTTPConnection(http.client.HTTPConnection):
+	#connects to the cached address of the host (see connectTo).
+	def connect(self):
+		self.sock = connectTo(self.host, self.port, self.timeout)
+#*** END OF PooledHTTPConnection **********************************************
+
+
+class PooledHTTPSConnection(http.client.HTTPSConnection):
+	#through a proxy, host is the proxy's and set_tunnel() has been given
+	#the real one. TLS starts once the proxy has CONNECTed us to it.
+	def __init__(self, host, port, timeout, context):
+		http.client.HTTPSConnection.__init__(self, host, port, \
+			timeout=timeout, context=context)
+		self.sslContext = context
+
+	def connect(self):
+		sock = connectTo(self.host, self.port, self.timeout)
+		try:
+			if self._tunnel_host:
+				self.sock = sock
+				self._tunnel()
+			self.sock = self.sslContext.wrap_socket(sock, \
+				server_hostname=self._tunnel_host or self.host)
+		except BaseException:
+			sock.close()
+			raise
+#*** END OF PooledHTTPSConnection *********************************************
+
+
+#>>> DNS <<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<
+#(host, port) -> (when it was looked up, getaddrinfo()'s answer)
+addressCache = {}
+addressLock = threading.Lock()
+
+def resolveHost(host, port):
+	#getaddrinfo(), remembered for DNS_CACHE_SECONDS.
+	now = time.monotonic()
+	with addressLock:
+		cached = addressCache.get((host, port))
+	if cached is not None and now - cached[0] < DNS_CACHE_SECONDS:
+		return cached[1]
+	addresses = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+	with addressLock:
+		addressCache[(host, port)] = (now, addresses)
+	return addresses
+#*** END OF resolveHost() *****************************************************
+
+
+def connectTo(host, port, timeout):
+	#like socket.create_connection(), but using resolveHost(). An address
+	#that won't connect is forgotten, so the next try looks the host up again.
+	error = None
+	for family, socketType, protocol, _, address in resolveHost(host, port):
+		sock = socket.socket(family, socketType, protocol)
+		try:
+			sock.settimeout(timeout)
+			sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+			sock.connect(address)
+			return sock
+		except OSError as connectError:
+			sock.close()
+			error = connectError
+	with addressLock:
+		addressCache.pop((host, port), None)
+	raise error or OSError("no addresses for %s" % host)
+#*** END OF connectTo() *******************************************************
+
+
+#>>> DECOMPRESSING <<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<
+def getDecoder(encoding):
+	#something with decompress(data) and flush() for a Content-Encoding, or
+	#None if the body isn't compressed.
+	encoding = encoding.strip().lower()
+	if encoding in ("", "identity"):
+		return None
+	if encoding in ("gzip", "x-gzip"):
+		return zlib.decompressobj(16 + zlib.MAX_WBITS)
+	if encoding == "deflate":
+		return DeflateDecoder()
+	if encoding == "br" and brotli is not None:
+		return BrotliDecoder()
+	raise ValueError("unsupported content encoding: %s" % encoding)
+#*** END OF getDecoder() ******************************************************
+
+
+class DeflateDecoder:
+	#"deflate" is meant to be zlib-wrapped, but plenty of servers send a raw
+	#deflate stream. Try the first, fall back on the second.
+	def __init__(self):
+		self.decoder = zlib.decompressobj()
+		self.started = False
+
+	def decompress(self, data):
+		if self.started:
+			return self.decoder.decompress(data)
+		self.started = True
+		try:
+			return self.decoder.decompress(data)
+		except zlib.error:
+			self.decoder = zlib.decompressobj(-zlib.MAX_WBITS)
+			return self.decoder.decompress(data)
+
+	def flush(self):
+		return self.decoder.flush()
+#*** END OF DeflateDecoder ****************************************************
+
+
+class BrotliDecoder:
+	#the brotli module's Decompressor spells "decompress" as process().
+	def __init__(self):
+		self.decoder = brotli.Decompressor()
+
+	def decompress(self, data):
+		try:
+			return self.decoder.process(data)
+		except brotli.error as error:
+			raise ValueError("bad br body: %s" % error)
+
+	def flush(self):
+		return b""
+#*** END OF BrotliDecoder *****************************************************
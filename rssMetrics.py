@@ -0,0 +1,246 @@
+''' ~*~{O}~*~
+	rssMetrics.py
+	Comment:
+		Timing and per-feed numbers for rssMonitor.py runs, exported in the
+		Prometheus text format (as a file for node_exporter's textfile
+		collector, and/or over HTTP), plus a cProfile helper.
+
+		span(stage): times a stage of a run (load, fetch, check, save). Time
+			spent in the same stage adds up over the run.
+		pause(stage): inside a span, time that doesn't belong to it (ie. the
+			checking done as each feed arrives, inside the fetch span).
+		recordFeed(url, ...): per-feed status, bytes, timings and entry counts.
+
+	NOTE: nothing is recorded until enableMetrics() is called. Until then
+		span() hands back one shared do-nothing context manager and
+		recordFeed() returns straight away, so the hot paths cost (next to)
+		nothing.
+'''
+
+import contextlib, logging, os, tempfile, threading, time
+
+#per-feed fields, their metric names and help text, in the order they're
+#written out.
+FEED_METRICS = (
+	("status", "rssmonitor_feed_status", "HTTP status of the last fetch."),
+	("bytes", "rssmonitor_feed_bytes", "Bytes downloaded for the feed."),
+	("connectSeconds", "rssmonitor_feed_connect_seconds", \
+		"Seconds from sending the request to getting headers (DNS included)."),
+	("readSeconds", "rssmonitor_feed_read_seconds", \
+		"Seconds spent reading the body."),
+	("parseSeconds", "rssmonitor_feed_parse_seconds", \
+		"Seconds spent parsing the body."),
+	("entries", "rssmonitor_feed_entries", "Entries in the parsed feed."),
+	("newEntries", "rssmonitor_feed_new_entries", "New entries found."),
+)
+
+#the Metrics for this process, or None while metrics are switched off.
+metrics = None
+
+NULL_SPAN = contextlib.nullcontext()
+
+def enableMetrics(filePath="", port=0):
+	#switch metrics on. After every run they're written to filePath (if
+	#there is one) and served on port (0 means don't serve them).
+	#calling it again just returns the Metrics already running.
+	global metrics
+	if metrics is None:
+		metrics = Metrics(filePath)
+		if port > 0:
+			serveMetrics(metrics, port)
+	return metrics
+#*** END OF enableMetrics() ***************************************************
+
+
+def span(stage):
+	#with span("fetch"): ... adds the time taken to the "fetch" stage.
+	if metrics is None:
+		return NULL_SPAN
+	return metrics.span(stage)
+#*** END OF span() ************************************************************
+
+
+def pause(stage):
+	#with pause("fetch"): ... takes the time taken back off the "fetch" stage,
+	#so stages that run inside one another still add up to the run.
+	if metrics is None:
+		return NULL_SPAN
+	return metrics.pause(stage)
+#*** END OF pause() ***********************************************************
+
+
+def recordFeed(url, **fields):
+	#ie. recordFeed(url, status=200, bytes=1234). See FEED_METRICS.
+	if metrics is not None:
+		metrics.recordFeed(url, fields)
+#*** END OF recordFeed() ******************************************************
+
+
+def startRun():
+	if metrics is not None:
+		metrics.startRun()
+#*** END OF startRun() ********************************************************
+
+
+def finishRun():
+	if metrics is not None:
+		metrics.finishRun()
+#*** END OF finishRun() *******************************************************
+
+
+def profileRun(function, filePath, *args, **kwargs):
+	#call function under cProfile and dump the stats to filePath (read them
+	#with pstats or snakeviz). Returns whatever function returned.
+	import cProfile
+	profiler = cProfile.Profile()
+	try:
+		return profiler.runcall(function, *args, **kwargs)
+	finally:
+		profiler.dump_stats(filePath)
+#*** END OF profileRun() ******************************************************
+
+
+#>>> METRICS <<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<
+class Metrics:
+	#the numbers for the run in progress, and the text of the last finished
+	#run. Feeds are fetched on several threads, so everything goes through
+	#self.lock.
+	def __init__(self, filePath=""):
+		self.filePath = filePath
+		self.lock = threading.Lock()
+		self.stages = {}
+		self.feeds = {}
+		self.runStart = time.time()
+		self.text = ""
+
+	def startRun(self):
+		with self.lock:
+			self.stages = {}
+			self.feeds = {}
+			self.runStart = time.time()
+
+	def finishRun(self):
+		#(a metrics file that can't be written is no reason to fail the run)
+		text = self.getText()
+		with self.lock:
+			self.text = text
+		if self.filePath != "":
+			try:
+				writeTextFile(self.filePath, text)
+			except OSError as error:
+				logging.error("Couldn't write metrics to %s: %s" % \
+					(self.filePath, error))
+
+	@contextlib.contextmanager
+	def span(self, stage):
+		start = time.perf_counter()
+		try:
+			yield
+		finally:
+			elapsed = time.perf_counter() - start
+			with self.lock:
+				self.stages[stage] = self.stages.get(stage, 0.0) + elapsed
+
+	@contextlib.contextmanager
+	def pause(self, stage):
+		start = time.perf_counter()
+		try:
+			yield
+		finally:
+			elapsed = time.perf_counter() - start
+			with self.lock:
+				self.stages[stage] = self.stages.get(stage, 0.0) - elapsed
+
+	def recordFeed(self, url, fields):
+		with self.lock:
+			self.feeds.setdefault(url, {}).update(fields)
+
+	def getText(self):
+		#the run so far in the Prometheus text exposition format.
+		with self.lock:
+			stages = dict(self.stages)
+			feeds = {url: dict(fields) for url, fields in self.feeds.items()}
+			runStart = self.runStart
+
+		lines = ["# HELP rssmonitor_run_start_time_seconds When the run started.",
+			"# TYPE rssmonitor_run_start_time_seconds gauge",
+			"rssmonitor_run_start_time_seconds %.3f" % runStart,
+			"# HELP rssmonitor_stage_seconds Seconds spent in each stage.",
+			"# TYPE rssmonitor_stage_seconds gauge"]
+		for stage in sorted(stages):
+			lines.append('rssmonitor_stage_seconds{stage="%s"} %.6f' % \
+				(escapeLabel(stage), stages[stage]))
+		lines.append("# HELP rssmonitor_feeds Feeds fetched this run.")
+		lines.append("# TYPE rssmonitor_feeds gauge")
+		lines.append("rssmonitor_feeds %i" % len(feeds))
+
+		for field, name, helpText in FEED_METRICS:
+			lines.append("# HELP %s %s" % (name, helpText))
+			lines.append("# TYPE %s gauge" % name)
+			for url in sorted(feeds):
+				if feeds[url].get(field) is not None:
+					lines.append('%s{url="%s"} %s' % (name, escapeLabel(url), \
+						formatValue(feeds[url][field])))
+		return "\n".join(lines) + "\n"
+#*** END OF Metrics ***********************************************************
+
+
+def escapeLabel(value):
+	#label values escape backslashes, double quotes and newlines.
+	return str(value).replace("\\", "\\\\").replace('"', '\\"') \
+		.replace("\n", "\\n")
+#*** END OF escapeLabel() *****************************************************
+
+
+def formatValue(value):
+	if isinstance(value, float):
+		return "%.6f" % value
+	return str(int(value))
+#*** END OF formatValue() *****************************************************
+
+
+#>>> EXPORTING <<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<
+def writeTextFile(filePath, text):
+	#write to a temporary file and rename it over filePath, so a collector
+	#never reads half a file.
+	directory = os.path.dirname(os.path.abspath(filePath))
+	handle, tempPath = tempfile.mkstemp(prefix=".metrics-", dir=directory)
+	try:
+		with os.fdopen(handle, "w") as store:
+			store.write(text)
+		#mkstemp makes it readable by us only.
+		os.chmod(tempPath, 0o644)
+		os.replace(tempPath, filePath)
+	except OSError:
+		if os.path.exists(tempPath):
+			os.remove(tempPath)
+		raise
+#*** END OF writeTextFile() ***************************************************
+
+
+def serveMetrics(metrics, port, host=""):
+	#serve metrics over HTTP from a background thread. Returns the server.
+	#(http.server is only imported by the programs that serve metrics)
+	from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+	
+	class MetricsHandler(BaseHTTPRequestHandler):
+		#serves the last finished run's text on any path.
+		def do_GET(self):
+			with self.server.metrics.lock:
+				body = self.server.metrics.text.encode("utf-8")
+			self.send_response(200)
+			self.send_header("Content-Type", "text/plain; version=0.0.4")
+			self.send_header("Content-Length", str(len(body)))
+			self.end_headers()
+			self.wfile.write(body)
+		
+		def log_message(self, format, *args):
+			#scrapes don't belong in the log
+			pass
+	
+	server = ThreadingHTTPServer((host, port), MetricsHandler)
+	server.daemon_threads = True
+	server.metrics = metrics
+	threading.Thread(target=server.serve_forever, daemon=True).start()
+	return server
+#*** END OF serveMetrics() ****************************************************
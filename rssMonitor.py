@@ -13,7 +13,8 @@
 			feedJSON["feedList"]
 		feedData: one of the dictionarys in feedList, accessable at
 			feedJSON["feedList"][index]
-		parsedFeeds: the list of parsed feeds returned fom feedparser.
+		parsedFeeds: the list of parsed feeds. Each is a FeedRecord holding
+			only what the checker needs from what feedparser returned.
 		parsedFeed: data from a single parsed feed, accessable at 
 			parsedFeeds[index]. index is the same between feedData and 
 			parsedFeed.
@@ -25,20 +26,130 @@
 		what time zone the feed comes from. It is better to compare it with
 		its own timestamps.
 	
+	NOTE: New entries are found by looking their id/link hash up in the
+		feed's "seenEntries". "latestTimeStamp" and "latestEntryTitle" are
+		only used for feeds which don't have seenEntries yet.
+	
+	NOTE: the same feed can be in feedList more than once (http and https,
+		with and without a trailing slash, an old url that now permanently
+		redirects...). Each copy keeps its own feedData, but they're only
+		fetched once per run (see getFeedGroups) and the parsedFeed is
+		shared between them.
+	
+	NOTE: requests to each host are spaced out by a token bucket, and a
+		host that keeps failing is left alone for a while by a circuit
+		breaker (see rssFetch.py). The breakers are kept in feedJSON's
+		"hostBreakers", so a dead host stays skipped from one run to the next.
+	
+	NOTE: every new entry (with a plain text summary) is also kept in an
+		EntryArchive next to the store, which can be searched with
+		"python rssCli.py search". See rssArchive.py.
+	
 	NOTE: put [chcp 65001] into CMD (sans brackets) to enter Unicode Mode
 
-	TODO: Add a timer when loading the feeds from the internet - 10s or so
 	TODO: Add a date & time next to each entry when printing?
 	TODO: Create custom errors
 	TODO: use a function to protect from attribute errors when getting things
 		from a parsed feed
 '''
 
-import feedparser, time, json, logging, sys
-from datetime import datetime
+import time, logging, sys, threading, socket, heapq, hashlib, io
+import json, contextlib, html, re, queue
+from xml.etree import ElementTree
+from concurrent.futures import ThreadPoolExecutor, BrokenExecutor, \
+	TimeoutError as FuturesTimeout
+from datetime import datetime, timedelta
 from os import path
-
-def main():
+from urllib.parse import urlsplit, urljoin
+from rssStore import getFeedStore, migrateStore, FeedJournal, loadStore, \
+	saveStore
+import rssMetrics
+
+#feedparser (and its _parse_date) once loadFeedparser() has imported it.
+feedparser = None
+_parse_date = None
+
+#how many feeds get fetched at once, and how many of those may be talking to
+#the same host at any one time (0 means no per-host limit - not even
+#rssFetch.HOST_RATE's).
+FETCH_WORKERS = 8
+HOST_LIMIT = 2
+
+#seconds to wait on any one connect/read, and the most a whole check run is
+#allowed to spend fetching (0 means no deadline). Feeds that don't make it
+#are skipped and keep their stored state until next time.
+FETCH_TIMEOUT = 10
+RUN_DEADLINE = 120
+
+#base seconds between checks of a feed, by feed urgency (0=immediate,
+#1=daily, 2=weekly), and the longest the daemon sleeps before looking for
+#edits to the feed store.
+POLL_INTERVALS = {0: 15 * 60, 1: 60 * 60, 2: 6 * 60 * 60}
+DAEMON_MAX_SLEEP = 60
+
+#adaptive polling: how many gaps between posts each feed remembers, how much
+#longer to wait after each check that turns up nothing, and the longest any
+#feed goes unchecked (failures back off by doubling up to the same limit).
+POST_GAP_HISTORY = 16
+IDLE_BACKOFF = 1.25
+MAX_POLL_INTERVAL = 24 * 60 * 60
+
+#how many entry keys each feed remembers in its "seenEntries" ring.
+SEEN_CAPACITY = 200
+
+#archive new entries (see rssArchive.py), and the most characters of each
+#one's summary that are kept. Summaries are only kept for entries the feed
+#hasn't seen before, so a run doesn't hold on to every summary of every feed.
+ARCHIVE_ENTRIES = True
+SUMMARY_CHARS = 500
+
+#parse feeds in this many separate processes (0 means parse them in the
+#fetching threads). Worth it on multi-core machines with big feed lists, since
+#feedparser is pure Python and the threads share one core between them.
+PARSE_WORKERS = 0
+
+#stream feeds we've seen before, stopping a little past the first entry we
+#already know instead of downloading and parsing the whole document (see
+#streamFeed). STREAM_OVERLAP is how many known entries in a row it takes to
+#stop. An entry that turns up further down than that (backdated, or the feed
+#shuffled its order) isn't noticed - turn STREAM_PARSE off if that matters.
+STREAM_PARSE = True
+STREAM_OVERLAP = 5
+
+#the namespaces whose <title>, <link>, <guid> and <id> are an entry's own
+#(RSS 2.0 has none), as opposed to ie. <itunes:title> or <media:title>.
+FEED_NAMESPACES = ("", "http://www.w3.org/2005/Atom", \
+	"http://purl.org/atom/ns#", "http://purl.org/rss/1.0/", \
+	"http://my.netscape.com/rdf/simple/0.9/", "http://backend.userland.com/rss2")
+XML_BASE = "{http://www.w3.org/XML/1998/namespace}base"
+
+#Prometheus-style metrics for every run (see rssMetrics.py): a text file to
+#write them to after each run, and a port to serve them on. "" and 0 mean
+#off, and with both off nothing is measured at all.
+METRICS_FILE = ""
+METRICS_PORT = 0
+
+#see getParsePool()
+parsePool = None
+
+def loadFeedparser():
+	#feedparser is slow to import (it drags its html sanitizers and sgmllib
+	#in with it), and a run with nothing to fetch never needs it. So it's
+	#imported here, the first time something is actually parsed.
+	global feedparser, _parse_date
+	if feedparser is None:
+		import feedparser as module
+		try:
+			from feedparser.datetimes import _parse_date as parseDate
+		except ImportError:
+			#feedparser 5 kept it at the top level
+			from feedparser import _parse_date as parseDate
+		_parse_date = parseDate
+		feedparser = module
+	return feedparser
+#*** END OF loadFeedparser() **************************************************
+
+def main(filePath=""):
 	decorative = "=-=-=-=-=-=-=-=-=-=-=-=-=\n"
 	
 	logging.basicConfig(filename='rssMonitor.log', level = logging.DEBUG)
@@ -49,23 +160,39 @@ def main():
 	#revertFeedDates("2016-03-08 00:00:00")
 	
 	try:
-		result = checkFeeds()
+		result = checkFeeds(filePath)
 	except RuntimeError as error:
 		print("\nFatal Error: %s" % error)
 		logging.critical("Fatal Error: %s" % error)
 	else:
-		#print total and summaries
-		print(result[1] + result[2])
-		
-		#print results
-		for string in result[3]:
-			print(decorative + string)
+		writeCheckResult(result, sys.stdout, decorative)
 
 	logging.info("all processes finished!")
 #*** END OF MAIN **************************************************************
 
 
-def scheduledCheck():
+def streamCheck(target="-", filePath="", onlyDue=False):
+	#checks every feed like main() (or, with onlyDue, the ones that are due
+	#like scheduledCheck()), but writes each new entry to target as a line of
+	#JSON as soon as its feed has been checked (see JSONLinesWriter and
+	#openOutput). The progress counters go to stderr instead of stdout.
+	logging.basicConfig(filename='rssMonitor.log', level = logging.INFO)
+	logging.info("Starting up, streaming to %s" % target)
+	
+	try:
+		writer = JSONLinesWriter(openOutput(target))
+		try:
+			with contextlib.redirect_stdout(sys.stderr):
+				checkFeeds(filePath, onlyDue=onlyDue, onResult=writer.write)
+		finally:
+			writer.close()
+	except RuntimeError as error:
+		print("\nFatal Error: %s" % error, file=sys.stderr)
+		logging.critical("Fatal Error: %s" % error)
+#*** END OF streamCheck() *****************************************************
+
+
+def scheduledCheck(filePath=""):
 	#call this method when running a regular check.
 	decorative = "=-=-^-=-=\n"
 	
@@ -73,24 +200,156 @@ def scheduledCheck():
 	logging.warning("Starting up at %s" % str(datetime.now()))
 	
 	try:
-		result = checkFeeds()
+		#only the feeds which are due - see getPollInterval()
+		result = checkFeeds(filePath, onlyDue=True)
 	except RuntimeError as error:
 		return ("Fatal Error: %s" % error)
 		logging.critical("Fatal Error: %s" % error)
 	else:
-		if(result[0] == 0):
+		if(result.totalTally == 0):
 			#no new feeds. Return nothing.
 			return ""
 		
-		finalString = (result[1] + result[2])
-		for string in result[3]:
-			finalString = finalString + decorative + string
+		finalString = io.StringIO()
+		writeCheckResult(result, finalString, decorative, "")
+		return finalString.getvalue()
 #*** END OF scheduledCheck() **************************************************
 
 
-def checkFeeds(filePath="", entryCap=0, urgency=-1):
+def runDaemon(filePath="", workers=FETCH_WORKERS, hostLimit=HOST_LIMIT, \
+	timeout=FETCH_TIMEOUT, deadline=RUN_DEADLINE):
+	#stay resident and check each feed on its own schedule instead of
+	#checking everything whenever cron starts us up. The feed store is only
+	#re-read if something else changes it, and the worker threads stay alive
+	#between checks. An edit made while feeds are being checked is merged
+	#with what the check found rather than saved over (see mergeFeedJSON).
+	#See getPollInterval() for how often each feed gets checked. Runs until
+	#interrupted.
+	#--- SETUP ----------------------------------------------------------------
+	datetimeFormat = "%Y-%m-%d %H:%M:%S"
+	decorative = "=-=-^-=-=\n"
+	
+	logging.basicConfig(filename='rssMonitor.log', level = logging.INFO)
+	logging.info("Starting daemon at %s" % str(datetime.now()))
+	
+	filePath = getStorePath(filePath)
+	pool = ThreadPoolExecutor(max_workers=max(1, workers))
+	if METRICS_FILE != "" or METRICS_PORT > 0:
+		rssMetrics.enableMetrics(METRICS_FILE, METRICS_PORT)
+	feedJSON = None
+	storeTime = None
+	unsaved = []		#checked feeds (indices in feedJSON) not saved yet
+	
+	#--- MAIN CODE ------------------------------------------------------------
+	try:
+		while True:
+			#(re)load the store if it was edited behind our back, picking
+			#up each feed's "nextCheck". Checked feeds that couldn't be
+			#saved last time are merged into it.
+			try:
+				if feedJSON is None or \
+					storeTime != getFeedStore(filePath).getModifiedTime():
+					storedJSON = loadFeedJSON(filePath)
+					if len(unsaved) > 0:
+						storedJSON = mergeFeedJSON(storedJSON, feedJSON, unsaved)
+						saveFeedJSON(filePath, storedJSON)
+					feedJSON, unsaved = (storedJSON, [])
+					schedule = getSchedule(feedJSON)
+					storeTime = getFeedStore(filePath).getModifiedTime()
+					logging.info("Loaded %i feeds" % len(schedule))
+			except (RuntimeError, OSError) as error:
+				#(a half-made edit, the store moved away...) carry on with
+				#the feeds we have and try again next time round.
+				logging.error("Couldn't reload %s: %s" % (filePath, error))
+				if feedJSON is None:
+					time.sleep(DAEMON_MAX_SLEEP)
+					continue
+			
+			if len(schedule) == 0:
+				time.sleep(DAEMON_MAX_SLEEP)
+				continue
+			
+			#sleep until the next feed is due, waking up now and then to
+			#notice edits to the store.
+			wait = schedule[0][0] - time.time()
+			if wait > 0:
+				time.sleep(min(wait, DAEMON_MAX_SLEEP))
+				continue
+			
+			#pull every feed that's due off the queue and check them together.
+			due = []
+			while len(schedule) > 0 and schedule[0][0] <= time.time():
+				due.append(heapq.heappop(schedule)[1])
+			due.sort()
+			
+			startDatetime = trimNow_ms()
+			rssMetrics.startRun()
+			feedCount, duplicates = getDuplicateCount(feedJSON, due)
+			parsedFeeds = refreshFeeds(feedJSON, due, workers, hostLimit, \
+				timeout, deadline, pool)
+			result = checkParsedFeeds(feedJSON, parsedFeeds, due)
+			result.feedCount, result.duplicates = (feedCount, duplicates)
+			archiveFeedResults(filePath, result.feedResults)
+			
+			if result.totalTally > 0:
+				writeCheckResult(result, sys.stdout, decorative)
+				feedJSON["lastNotify"] = datetime.strftime(startDatetime, \
+					datetimeFormat)
+			feedJSON["lastCheck"] = datetime.strftime(startDatetime, \
+				datetimeFormat)
+			#(rssCli.py may have edited the store while we were fetching.)
+			#If the store can't be read or written the checked feeds stay
+			#in unsaved until it can.
+			unsaved = sorted(set(unsaved) | set(due))
+			edited = False
+			try:
+				storedJSON = feedJSON
+				if storeTime != getFeedStore(filePath).getModifiedTime():
+					storedJSON = mergeFeedJSON(loadFeedJSON(filePath), \
+						feedJSON, unsaved)
+				saveFeedJSON(filePath, storedJSON)
+				edited = storedJSON is not feedJSON
+				feedJSON, unsaved = (storedJSON, [])
+				storeTime = getFeedStore(filePath).getModifiedTime()
+			except (RuntimeError, OSError) as error:
+				logging.error("Couldn't save %s, will try again: %s" % \
+					(filePath, error))
+			rssMetrics.finishRun()
+			
+			#put the feeds back in the queue for their next check. After an
+			#edit the indices may have moved, so everything is queued again.
+			if edited:
+				schedule = getSchedule(feedJSON)
+			else:
+				for index in due:
+					heapq.heappush(schedule, \
+						(getNextCheckTime(feedJSON["feedList"][index]), index))
+			if len(schedule) > 0:
+				logging.info("Checked %i feeds, next check in %is" % \
+					(len(due), schedule[0][0] - time.time()))
+			else:
+				logging.info("Checked %i feeds, none left" % len(due))
+	except KeyboardInterrupt:
+		logging.info("Daemon stopped")
+	finally:
+		pool.shutdown(wait=False, cancel_futures=True)
+#*** END OF runDaemon() *******************************************************
+
+
+def checkFeeds(filePath="", entryCap=0, urgency=-1, workers=FETCH_WORKERS, \
+	hostLimit=HOST_LIMIT, timeout=FETCH_TIMEOUT, deadline=RUN_DEADLINE, \
+	onlyDue=False, onResult=None):
 	#you are responsible for catching thrown errors.
 	#checkFeeds should only throw RuntimeError's
+	#workers, hostLimit, timeout and deadline are passed to fetchFeeds().
+	#with onlyDue, feeds whose "nextCheck" hasn't come yet are left alone.
+	#new entries are archived at the end of the run (see archiveFeedResults).
+	#each feed is checked as soon as it has been fetched. onResult (if given)
+	#is called with the FeedResult of every feed that has new entries right
+	#then, so it doesn't have to wait for the slowest feed.
+	#every checked feed is also written to the store's FeedJournal straight
+	#away. If a run is killed, the next one replays the journal and only
+	#checks the feeds that were left (see replayJournal).
 	#--- SETUP ----------------------------------------------------------------
 	#configure the format which time is loaded/saved in.
 	#CAUTION! Changing this might (will) cause issues with parsing the time.
@@ -98,101 +357,204 @@ def checkFeeds(filePath="", entryCap=0, urgency=-1):
 	
 	#make sure that you have a path. by default filePath = ""
 	#if filePath is still "", set it to feeds.txt in the program's folder
-	if filePath == "":
-		filePath = path.dirname(path.realpath(__file__)) + "/feeds.txt"
-	#ensure that the path is normalized.
-	filePath = path.abspath(filePath)
-		
-	totalTally = 0
-	heading = "" 		#contains totalTally, summary of all feeds
-	fullSummary = ""	#contains individual feed summaries
-	results = [] 		#contains all the new entry names
-
-	#open the JSON file (it can take a few seconds to parse the feeds)
-	feedJSON, parsedFeeds = loadFeeds(filePath)
-			
-	#with feedList, I can only modify objects in its array, not the array
-	#itself. This makes code more readable.
-	feedList = feedJSON["feedList"]
-		
+	filePath = getStorePath(filePath)
+	
+	if METRICS_FILE != "" or METRICS_PORT > 0:
+		rssMetrics.enableMetrics(METRICS_FILE, METRICS_PORT)
+	rssMetrics.startRun()
+
+	#open the JSON file, catch up on any run that didn't finish, and work out
+	#which feeds to check.
+	feedJSON = loadFeedJSON(filePath)
+	storeTime = getFeedStore(filePath).getModifiedTime()
+	result = CheckResult()
+	feedResults = {}
+	journal = FeedJournal(filePath)
+	resumed = replayJournal(feedJSON, journal, result, feedResults)
+	
+	indices = None
+	if onlyDue:
+		indices = getDueIndices(feedJSON)
+		logging.info("%i of %i feeds are due" % \
+			(len(indices), len(feedJSON["feedList"])))
+	if len(resumed) > 0:
+		if indices is None:
+			indices = range(len(feedJSON["feedList"]))
+		indices = [index for index in indices if not index in resumed]
+	
+	#(counted before the fetch notices any feeds that have moved)
+	result.feedCount, result.duplicates = getDuplicateCount(feedJSON, indices)
+	
 	#go ahead and set the start time and note it in the log
 	startDatetime = trimNow_ms()
 	logging.info("Last checked at [%s],\n\tnow checking at [%s]" % \
 		(feedJSON["lastCheck"],str(startDatetime)))
 	#--- MAIN CODE ------------------------------------------------------------
-	#loop through each parsedFeed, building a list of new entries
-	for index, parsedFeed in enumerate(parsedFeeds):
-		print("checking feed %i/%i  "  % \
-			(index + 1,len(feedJSON["feedList"])), end="\r")
-
-		try:
-			#get the feed's results in a tuple.
-			#([0]counter, [1]feedSummary, [2]entryList)
-			feedResult = getFeedEntries(parsedFeed, feedList[index], 5)
-		except SyntaxError:
-			logging.error("Feed [%i]:[%s] probably has an invalid URL." % \
-			(index, feedList[index]["url"]))
-		except ValueError:
-			logging.error("Feed [%i] has no entries (code doesn't handle that \
-			well" % index)
-		else:
-			#--- CLERICAL CODE - Can't run if try fails! ----------------------
-			#update totalTally
-			totalTally = totalTally + feedResult[0]
-
-			#if there were new items detected, add to summary and results.
-			if feedResult[0] > 0:
-				fullSummary = fullSummary + feedResult[1]#string
-				results.append(feedResult[2])#list
-		#--- END OF TRY -------------------------------------------------------
+	def checkFetched(index, parsedFeed):
+		feedData = feedJSON["feedList"][index]
+		#(timed as "check" by refreshFeeds)
+		feedResult = checkParsedFeed(result, feedData, parsedFeed, index)
+		journal.append(getJournalRecord(index, feedData, feedResult))
+		if feedResult is not None:
+			feedResults[index] = feedResult
+			if onResult is not None:
+				onResult(feedResult)
 	
+	#parse the feeds (it can take a few seconds)
+	try:
+		parsedFeeds = refreshFeeds(feedJSON, indices, workers, hostLimit, \
+			timeout, deadline, onFetched=checkFetched, keep=False)
+	finally:
+		#(if we're being killed, whatever made it into the journal stays)
+		journal.close()
 	
-	#the next two try statements are affected if there are no entries.
-		try:
-			#get the feed's most recent timestamp
-			newTimestamp = str(timeToDt(parsedFeed.entries[0].updated_parsed))
-			#feedparser uses time_struct, I want a string.
-			#store the timestamp for next time.
-			feedList[index]["latestTimeStamp"] = newTimestamp
-		except AttributeError:
-			#if there's no attribute "updated_parsed", delete "latestTimeStamp"
-			#if it exists (if it doesn't, None is returned by pop.)
-			feedList[index].pop("latestTimeStamp",None)
-		except IndexError:
-			#if there are no entries at all, then an IndexError occurs.
-			logging.error("Feed [%i]:[%s] has no entries!" % \
-			(index, feedList[index]["url"]))
-		
-		try:
-			#also store the title of the newest entry
-			feedList[index]["latestEntryTitle"] = \
-			parsedFeed.entries[0].title
-		except IndexError:
-			#same as above
-			pass
-			
-	#--- END OF LOOP ----------------------------------------------------------
-		
-	#Contextual output! total number of entries effects the main summary
-	if totalTally == 0:
-		heading = "There are no new entries in any of your feeds.\n"
-	elif totalTally == 1:
-		heading = "There is 1 new entry in all your feeds.\n"
-	else:
-		heading = "There are %i new entries in all your feeds.\n" % totalTally
+	#whatever never arrived, and the results back in feedList order.
+	if indices is None:
+		indices = range(len(parsedFeeds))
+	result.timedOut = len([index for index in indices \
+		if parsedFeeds[index] is None])
+	result.feedResults = [feedResults[index] for index in sorted(feedResults)]
+	logging.info("%i feeds not modified, %i bytes saved" % \
+		(result.notModified, result.bytesSaved))
+	
+	#archive the new entries. (A run killed after this reports them again,
+	#and the archive ignores entries it already has.)
+	archiveFeedResults(filePath, result.feedResults)
 	
 	#save the time we started in the JSON structure
 	feedJSON["lastCheck"] = datetime.strftime(startDatetime, datetimeFormat)
-	#and then save the JSON structure
+	#(into the store as it is now, if it was edited while we were fetching)
+	if storeTime != getFeedStore(filePath).getModifiedTime():
+		feedJSON = mergeFeedJSON(loadFeedJSON(filePath), feedJSON, \
+			sorted(set(indices) | resumed))
+	#and then save the JSON structure, which makes the journal redundant.
 	saveFeedJSON(filePath, feedJSON)
-		
-	return (totalTally, heading, fullSummary, results)
+	journal.remove()
+	rssMetrics.finishRun()
+	
+	#a CheckResult - see writeCheckResult() to turn it into text.
+	return result
 #*** END OF checkFeeds() ******************************************************
 
-def getFeedEntries(parsedFeed, feedData, entryCap):
-	#accepts a feed object and a datetime object to compare, returns a tuple
-	#containing the number of new elements, a string of text representing those
-	#elements and a summary string.
+
+def checkParsedFeeds(feedJSON, parsedFeeds, indices=None, entryCap=5):
+	#diffs each parsedFeed against its feedData, storing the newest timestamp
+	#and entry title back into feedJSON. Only the feeds in indices are looked
+	#at (all of them by default). Returns a CheckResult; entryCap is how many
+	#entry titles per feed it shows when it's written out.
+	#--- SETUP ----------------------------------------------------------------
+	result = CheckResult(entryCap)
+			
+	#with feedList, I can only modify objects in its array, not the array
+	#itself. This makes code more readable.
+	feedList = feedJSON["feedList"]
+	
+	if indices is None:
+		indices = range(len(feedList))
+	#--- MAIN CODE ------------------------------------------------------------
+	#loop through each parsedFeed, building a list of new entries
+	for count, index in enumerate(indices):
+		print("checking feed %i/%i  "  % (count + 1, len(indices)), end="\r")
+		with rssMetrics.span("check"):
+			feedResult = checkParsedFeed(result, feedList[index], \
+				parsedFeeds[index], index)
+		
+		#if there were new items detected, add them to the results.
+		if feedResult is not None:
+			result.feedResults.append(feedResult)
+	#--- END OF LOOP ----------------------------------------------------------
+	logging.info("%i feeds not modified, %i bytes saved" % \
+		(result.notModified, result.bytesSaved))
+		
+	return result
+#*** END OF checkParsedFeeds() ************************************************
+
+
+def checkParsedFeed(result, feedData, parsedFeed, index):
+	#diffs one parsedFeed against its feedData (see checkParsedFeeds) and
+	#adds it to the counts in result. Returns a FeedResult if the feed has
+	#new entries, otherwise None. index is only used for logging.
+	#the feed didn't arrive in time. Leave its stored state alone.
+	if parsedFeed is None:
+		result.timedOut = result.timedOut + 1
+		return None
+	
+	#or its host is known to be down, so it wasn't even asked.
+	if isSkipped(parsedFeed):
+		result.skipped = result.skipped + 1
+		return None
+	
+	#nothing changed since last time, so there's nothing to diff.
+	if isNotModified(parsedFeed):
+		result.notModified = result.notModified + 1
+		result.bytesSaved = result.bytesSaved + getGroupShare(result, \
+			feedData, "bytesSaved", feedData.get("lastBytes", 0))
+		return None
+	
+	feedResult = None
+	try:
+		#get the feed's results as a FeedResult.
+		feedResult = getFeedEntries(parsedFeed, feedData)
+	except SyntaxError:
+		if parsedFeed.error is not None:
+			logging.error("Feed [%i]:[%s] couldn't be fetched: %s" % \
+			(index, feedData["url"], parsedFeed.error))
+		else:
+			logging.error("Feed [%i]:[%s] probably has an invalid URL." % \
+			(index, feedData["url"]))
+	except ValueError:
+		logging.error("Feed [%i] has no entries (code doesn't handle that \
+		well" % index)
+	else:
+		#--- CLERICAL CODE - Can't run if try fails! --------------------------
+		#update totalTally
+		result.totalTally = result.totalTally + getGroupShare(result, \
+			feedData, "totalTally", feedResult.count)
+		rssMetrics.recordFeed(feedData["url"], newEntries=feedResult.count)
+		if feedResult.count == 0:
+			feedResult = None
+	#--- END OF TRY -----------------------------------------------------------
+	
+	#the rest is affected if there are no entries.
+	if len(parsedFeed.entries) == 0:
+		logging.error("Feed [%i]:[%s] has no entries!" % \
+		(index, feedData["url"]))
+		return feedResult
+	
+	#get the feed's most recent timestamp
+	newest = parsedFeed.entries[0]
+	if newest.updated_parsed is None:
+		#if there's no timestamp, delete "latestTimeStamp"
+		#if it exists (if it doesn't, None is returned by pop.)
+		feedData.pop("latestTimeStamp",None)
+	else:
+		#feedparser uses time_struct, I want a string.
+		#store the timestamp for next time.
+		feedData["latestTimeStamp"] = str(timeToDt(newest.updated_parsed))
+	
+	#also store the title of the newest entry
+	feedData["latestEntryTitle"] = newest.title
+	
+	#and remember every entry we've now seen.
+	updateSeenEntries(feedData, parsedFeed)
+	return feedResult
+#*** END OF checkParsedFeed() *************************************************
+
+
+def getGroupShare(result, feedData, total, value):
+	#duplicate feeds share one fetch (see getFeedGroups), so in a run's
+	#totals each group only counts as much as its biggest copy - four copies
+	#of a feed with one new entry are still one new entry. Returns how much
+	#of value feedData's copy adds to result's total (ie. "totalTally").
+	key = (total, getCanonicalUrl(getFetchUrl(feedData)))
+	counted = result.groupCounts.get(key, 0)
+	result.groupCounts[key] = max(counted, value)
+	return max(0, value - counted)
+#*** END OF getGroupShare() ***************************************************
+
+def getFeedEntries(parsedFeed, feedData):
+	#accepts a feed object and the feed's stored data to compare against,
+	#returns a FeedResult holding the new entries.
 	
 	#--- ERROR CHECK ----------------------------------------------------------
 	#quick, check that the feed is valid first!
@@ -205,49 +567,43 @@ def getFeedEntries(parsedFeed, feedData, entryCap):
 		raise ValueError("no entries in the feed!")
 	
 	#--- MAIN CODE ------------------------------------------------------------
-	logging.debug("Checking " + parsedFeed.feed.title)
-	entryResult = ""
+	logging.debug("Checking " + parsedFeed.title)
+	feedResult = FeedResult(parsedFeed.title, feedData)
 	
+	#The seen-entry ring is the reliable way to tell. Feeds checked before it
+	#existed fall back on the timestamp, then the entry title.
 	#If I haven't got a timestamp for the feed, I can just use the entry title.
 	# If I haven't got that either, I can just return all the entries. Easy.
-	if "latestTimeStamp" in feedData:
+	if "seenEntries" in feedData:
+		entryResult = getUnseenEntries(parsedFeed, \
+			set(feedData["seenEntries"].split()))
+	elif "latestTimeStamp" in feedData:
 		entryResult = getNewEntries(parsedFeed, feedData["latestTimeStamp"], \
-			True, entryCap)
+			True)
 	elif "latestEntryTitle" in feedData:
 		logging.error("Issue with timestamp!\tusing entry title instead.")
 		entryResult = getNewEntries(parsedFeed, feedData["latestEntryTitle"], \
-			False, entryCap)
+			False)
 	else:
 		logging.error("Issue with timestamp and entry title! \
 		\tCalling getAllEntries().")
-		entryResult = getAllEntries(parsedFeed, entryCap)
+		entryResult = getAllEntries(parsedFeed)
+		feedResult.allEntries = True
 
 	#--- FINISHING UP ---------------------------------------------------------
 	#entryResult = ([0] count, [1] entryList)
-	#produce the feed summary.
-	feedSummary = getFeedSummary(entryResult[0], parsedFeed.feed.title)
-
-	#add title to list
-	entryList = parsedFeed.feed.title + "\n" + entryResult[1]
-	#add a note if the total number of entries is over the cap.
-	if(entryResult[0] > entryCap):
-		entryList = "%s -> And %i more!\n" % (entryList, entryResult[0] - entryCap)
-	
-	#return count, the two strings, and the most recent timestamp in a tuple
-	return (entryResult[0], feedSummary, entryList)
+	feedResult.count, feedResult.entries = entryResult
+	return feedResult
 #*** END OF getFeedEntries() **************************************************
 
 
-def getNewEntries(parsedFeed, compareString, isTimestamp, entryCap):
+def getNewEntries(parsedFeed, compareString, isTimestamp):
 	#takes a feed object and a string to compare. isTimestamp tells the loop if
 	#it should treat compareString as a timestamp or an entry title. Returns a
-	#tuple with the total number of new entries and a string with their titles.
-	# (number of titles) = max(number of entries, entryCap)
+	#tuple with the total number of new entries and a list of them.
 	#--- SETUP ----------------------------------------------------------------
-	#keep track of the number of new entries
-	counter = 0
-	#holds the text output of this function.
-	entryList = ""
+	#holds the new entries
+	entryList = []
 	#temporary boolean value to hold the comparison result.
 	isNew = False
 	#--- MAIN CODE ------------------------------------------------------------
@@ -255,40 +611,34 @@ def getNewEntries(parsedFeed, compareString, isTimestamp, entryCap):
 	for entry in parsedFeed.entries:
 		#test the entry based on isTimestamp
 		if isTimestamp:
-			isNew = (timeToStr(entry.updated_parsed) > compareString)
+			#(an entry without a timestamp can't be shown to be new)
+			isNew = entry.updated_parsed is not None and \
+				(timeToStr(entry.updated_parsed) > compareString)
 		else:
 			isNew = (entry.title != compareString)
 		
 		#Check to see if the entry is new.
 		if isNew:
-			counter = counter + 1
-			if counter <= entryCap:
-				#add the entry's title to the end of the main list.
-				entryList = entryList + entry.title + "\n"
+			entryList.append(entry)
 		else:
 			break
-	return (counter, entryList)
+	return (len(entryList), entryList)
 #*** END OF getNewEntries() ***************************************************
 
 
-def getAllEntries(parsedFeed, entryCap):
-	#like getNewEntries(), but doesn't bother checking entries' timestamps
-	#--- SETUP ----------------------------------------------------------------
-	#keep track of the total number of entries
-	counter = 0
-	#variable to hold the text output of this function.
-	entryList = "-< All Entries >-\n"
+def getUnseenEntries(parsedFeed, seenKeys):
+	#like getNewEntries(), but an entry is new if its key (see getEntryKey())
+	#isn't in seenKeys. Every entry is looked at, so the order the feed lists
+	#them in - and their time zone - doesn't matter.
+	entryList = [entry for entry in parsedFeed.entries \
+		if not getEntryKey(entry) in seenKeys]
+	return (len(entryList), entryList)
+#*** END OF getUnseenEntries() ************************************************
 
-	#--- MAIN CODE ------------------------------------------------------------
-	#Go through all entries.
-	for entry in parsedFeed.entries:
-		counter = counter + 1
-		#we need to know how many new entries there are, but stop adding on
-		#their titles if we're past entryCap.
-		if counter <= entryCap:
-			#add the entry's title to the end of the main list.
-			entryList = entryList + entry.title + "\n"
-	return (counter, entryList)
+
+def getAllEntries(parsedFeed):
+	#like getNewEntries(), but doesn't bother checking entries' timestamps
+	return (len(parsedFeed.entries), list(parsedFeed.entries))
 #*** END OF getAllEntries() ***************************************************
 
 
@@ -304,100 +654,1271 @@ def getFeedSummary(count, title):
 #*** END OF getFeedSummary() **************************************************
 
 
-def revertFeedDates(newDate="1970-01-01 00:00:00",filePath=""):
-#--- SETUP ----------------------------------------------------------------
-	#configure the format which time is loaded/saved in.
-	#CAUTION! Changing this might cause issues with parsing the time.
-	datetimeFormat = "%Y-%m-%d %H:%M:%S"
+def getNotModifiedSummary(count, bytesSaved):
+#run summary line for the feeds that came back 304 Not Modified.
+	if count == 1:
+		summary = " > 1 feed unchanged since the last check"
+	else:
+		summary = " > %i feeds unchanged since the last check" % count
+	if bytesSaved > 0:
+		summary = summary + " (%.1f KiB not downloaded)" % (bytesSaved / 1024)
+	return summary + ".\n"
+#*** END OF getNotModifiedSummary() *******************************************
+
+
+def getTimedOutSummary(count):
+#run summary line for the feeds that were skipped because they timed out.
+	if count == 1:
+		return " > 1 feed timed out and was skipped.\n"
+	else:
+		return " > %i feeds timed out and were skipped.\n" % count
+#*** END OF getTimedOutSummary() **********************************************
+
+
+def getSkippedSummary(count):
+#run summary line for the feeds whose host's circuit breaker was open.
+	if count == 1:
+		return " > 1 feed was skipped because its host is down.\n"
+	else:
+		return " > %i feeds were skipped because their hosts are down.\n" % count
+#*** END OF getSkippedSummary() ***********************************************
+
+
+def getDuplicateSummary(count, feedCount):
+#run summary line for the feeds that shared another feed's download.
+	if count == 1:
+		summary = " > 1 feed was a duplicate"
+	else:
+		summary = " > %i feeds were duplicates" % count
+	return summary + " (%i fetches for %i feeds, %.0f%% saved).\n" % \
+		(feedCount - count, feedCount, 100.0 * count / max(1, feedCount))
+#*** END OF getDuplicateSummary() *********************************************
+
+
+#>>> RESULTS & OUTPUT <<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<
+class FeedResult:
+	#what a check found in one feed: how many new entries there are and the
+	#entries themselves. allEntries means there was nothing stored to compare
+	#against, so every entry in the feed was counted.
+	__slots__ = ("title", "url", "feedClass", "count", "entries", "allEntries")
+	
+	def __init__(self, title, feedData):
+		self.title = title
+		self.url = feedData["url"]
+		self.feedClass = feedData["class"]
+		self.count = 0
+		self.entries = []
+		self.allEntries = False
+#*** END OF FeedResult ********************************************************
+
+
+class CheckResult:
+	#what a whole check run found. feedResults only has the feeds with new
+	#entries in them. Nothing is turned into text until it's written out
+	#(see writeCheckResult), and then at most entryCap titles per feed.
+	__slots__ = ("totalTally", "feedResults", "notModified", "bytesSaved", \
+		"timedOut", "skipped", "feedCount", "duplicates", "entryCap", \
+		"groupCounts")
+	
+	def __init__(self, entryCap=5):
+		self.totalTally = 0
+		self.feedResults = []
+		self.notModified = 0	#feeds which answered 304 Not Modified
+		self.bytesSaved = 0		#roughly how much those 304s saved us
+		self.timedOut = 0		#feeds skipped because they took too long
+		self.skipped = 0		#feeds skipped because their host is down
+		self.feedCount = 0		#feeds checked this run
+		self.duplicates = 0		#of those, the ones fetched under another url
+		self.entryCap = entryCap
+		self.groupCounts = {}	#see getGroupShare()
+#*** END OF CheckResult *******************************************************
+
+
+def writeCheckResult(result, out, decorative, newline="\n"):
+	#writes a check run out the way main() has always printed it: the
+	#heading, each feed's summary, then each feed's new entries. out is
+	#anything with a write() method. newline goes after the summaries and
+	#after each feed's entries (print() adds one, scheduledCheck() doesn't).
+	out.write(getHeading(result))
+	for feedResult in result.feedResults:
+		out.write(getFeedSummary(feedResult.count, feedResult.title))
+	out.write(newline)
+	
+	for feedResult in result.feedResults:
+		out.write(decorative)
+		writeFeedEntries(feedResult, out, result.entryCap)
+		out.write(newline)
+#*** END OF writeCheckResult() ************************************************
+
+
+def writeFeedEntries(feedResult, out, entryCap):
+	#the feed's title, then the titles of up to entryCap of its new entries.
+	out.write(feedResult.title + "\n")
+	if feedResult.allEntries:
+		out.write("-< All Entries >-\n")
+	for entry in feedResult.entries[:entryCap]:
+		out.write(entry.title + "\n")
+	#add a note if the total number of entries is over the cap.
+	if feedResult.count > entryCap:
+		out.write(" -> And %i more!\n" % (feedResult.count - entryCap))
+#*** END OF writeFeedEntries() ************************************************
+
+
+def getHeading(result):
+	#Contextual output! total number of entries effects the main summary
+	if result.totalTally == 0:
+		heading = "There are no new entries in any of your feeds.\n"
+	elif result.totalTally == 1:
+		heading = "There is 1 new entry in all your feeds.\n"
+	else:
+		heading = "There are %i new entries in all your feeds.\n" % \
+			result.totalTally
+	
+	#note how many feeds we didn't have to download at all.
+	if result.notModified > 0:
+		heading = heading + getNotModifiedSummary(result.notModified, \
+			result.bytesSaved)
+	
+	#and the ones we gave up on.
+	if result.timedOut > 0:
+		heading = heading + getTimedOutSummary(result.timedOut)
+	if result.skipped > 0:
+		heading = heading + getSkippedSummary(result.skipped)
+	
+	#and the ones that turned out to be another feed under a different url.
+	if result.duplicates > 0:
+		heading = heading + getDuplicateSummary(result.duplicates, \
+			result.feedCount)
+	return heading
+#*** END OF getHeading() ******************************************************
+
+
+def getFeedResultJSON(feedResult):
+	#a FeedResult as plain json-able data (see makeFeedResult).
+	return {"title": feedResult.title, "url": feedResult.url, \
+		"class": feedResult.feedClass, "count": feedResult.count, \
+		"allEntries": feedResult.allEntries, "entries": [[entry.title, \
+		entry.link, entry.id, None if entry.updated_parsed is None else \
+		list(entry.updated_parsed)] for entry in feedResult.entries]}
+#*** END OF getFeedResultJSON() ***********************************************
+
+
+def makeFeedResult(resultJSON):
+	#turns getFeedResultJSON()'s data back into a FeedResult.
+	feedResult = FeedResult(resultJSON["title"], resultJSON)
+	feedResult.count = resultJSON["count"]
+	feedResult.allEntries = resultJSON["allEntries"]
+	feedResult.entries = [EntryRecord(title, link, id, None \
+		if updated is None else time.struct_time(updated)) \
+		for title, link, id, updated in resultJSON["entries"]]
+	return feedResult
+#*** END OF makeFeedResult() **************************************************
+
+
+def getCheckResultTuple(result):
+	#the old checkFeeds() return value, for anything that still wants it:
+	#(totalTally, heading, fullSummary, results)
+	fullSummary = "".join([getFeedSummary(feedResult.count, feedResult.title) \
+		for feedResult in result.feedResults])
+	results = []
+	for feedResult in result.feedResults:
+		entryList = io.StringIO()
+		writeFeedEntries(feedResult, entryList, result.entryCap)
+		results.append(entryList.getvalue())
+	return (result.totalTally, getHeading(result), fullSummary, results)
+#*** END OF getCheckResultTuple() *********************************************
+
+
+class JSONLinesWriter:
+	#writes new entries out as JSON Lines, one object per entry:
+	#{"class", "feed" (the feed's url), "link", "timestamp", "title"}
+	#timestamp is ISO 8601 UTC, or null if the entry doesn't have one. Pass
+	#write as checkFeeds()'s onResult to stream entries as feeds come in.
+	#a reader that goes away (a closed socket or pipe, a full disk...) is a
+	#RuntimeError, like any other reason checkFeeds() can't carry on.
+	def __init__(self, out):
+		self.out = out
+	
+	def write(self, feedResult):
+		try:
+			for entry in feedResult.entries:
+				timestamp = None
+				if entry.updated_parsed is not None:
+					timestamp = time.strftime("%Y-%m-%dT%H:%M:%SZ", \
+						entry.updated_parsed)
+				self.out.write(json.dumps({"feed": feedResult.url, \
+					"title": entry.title, "link": entry.link, \
+					"timestamp": timestamp, "class": feedResult.feedClass}, \
+					sort_keys=True) + "\n")
+			#whoever is reading shouldn't have to wait for the next feed.
+			self.out.flush()
+		except OSError as error:
+			raise RuntimeError("Couldn't write entries: %s" % error)
+	
+	def close(self):
+		if self.out is not sys.stdout:
+			try:
+				self.out.close()
+			except OSError as error:
+				raise RuntimeError("Couldn't write entries: %s" % error)
+#*** END OF JSONLinesWriter ***************************************************
+
+
+def openOutput(target="-"):
+	#somewhere to write output to: "-" is stdout, "unix:PATH" connects to the
+	#Unix socket at PATH, and anything else is a file to append to.
+	if target == "-":
+		return sys.stdout
+	if target.startswith("unix:"):
+		connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+		try:
+			connection.connect(target[len("unix:"):])
+		except OSError as error:
+			connection.close()
+			raise RuntimeError("Couldn't connect to %s: %s" % (target, error))
+		#the file object keeps the socket open until it's closed itself.
+		out = connection.makefile("w", encoding="utf-8")
+		connection.close()
+		return out
+	try:
+		return open(target, "a", encoding="utf-8")
+	except OSError as error:
+		raise RuntimeError("Couldn't open %s: %s" % (target, error))
+#*** END OF openOutput() ******************************************************
+
+
+def revertFeedDates(newDate="1970-01-01 00:00:00",filePath="",feedClass=None):
+	#see rssAdmin.FeedListEditor.revertFeeds(). feedClass limits it to the
+	#feeds of one class.
+	from rssAdmin import FeedListEditor
 	
 	#make sure that you have a path. by default filePath = ""
 	#if filePath is still "", set it to feeds.txt in the program's folder
-	if filePath == "":
-		filePath = path.dirname(path.realpath(__file__)) + "/feeds.txt"
-	#ensure that the path is normalized.
-	filePath = path.abspath(filePath)
+	filePath = getStorePath(filePath)
 	
+	#one load and one save, however many feeds there are.
+	with FeedListEditor(filePath) as editor:
+		count = editor.revertFeeds(newDate, feedClass)
+	logging.info("timestamps of %i feeds reverted to %s." % (count, newDate))
+	return count
+#*** END OF revertFeedDates() *************************************************
+
+#>>> FEED & ENTRY RECORDS <<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<
+class FeedRecord:
+	#the parts of a parsed feed the checker actually uses. What feedparser
+	#returns (every entry's content and summary, raw headers...) is boiled
+	#down to one of these as soon as the feed is parsed, so a check run only
+	#holds on to titles, links and timestamps.
+	#version is "" if it isn't a feed, and error says what went wrong. The
+	#HTTP details are None if unknown. movedTo is where the feed has
+	#permanently moved to, if it has. skippedUntil is set (to when the host
+	#can be tried again) if the feed wasn't fetched because its host is down.
+	#partial is True if streamFeed() stopped before the end of the feed, so
+	#entries doesn't hold everything the feed is serving.
+	__slots__ = ("version", "title", "link", "entries", "status", "href", \
+		"etag", "modified", "bytes", "error", "movedTo", "skippedUntil", \
+		"partial")
 	
-	#open the JSON file (it can take a few seconds to parse the feeds)
-	feedJSON = loadJSON(filePath)
+	def __init__(self, version="", title="", link=None, entries=None, \
+		status=None, error=None):
+		self.version = version
+		self.title = title
+		self.link = link
+		self.entries = entries if entries is not None else []
+		self.status = status
+		self.error = error
+		self.href = None
+		self.etag = None
+		self.modified = None
+		self.bytes = None
+		self.movedTo = None
+		self.skippedUntil = None
+		self.partial = False
+#*** END OF FeedRecord ********************************************************
+
+
+class EntryRecord:
+	#the parts of a feed entry the checker uses. Missing fields are None
+	#(the title is "" instead, since it's always printed). summary is only
+	#kept for the archive (see ARCHIVE_ENTRIES).
+	__slots__ = ("title", "link", "id", "updated_parsed", "summary")
 	
-	#reset timestamps in the JSON.
-	rewriteTimestamps(feedJSON, newDate)
-	logging.info("timestamps reverted to %s." % newDate)
+	def __init__(self, title="", link=None, id=None, updated_parsed=None, \
+		summary=None):
+		self.title = title
+		self.link = link
+		self.id = id
+		self.updated_parsed = updated_parsed
+		self.summary = summary
+#*** END OF EntryRecord *******************************************************
+
+
+def makeFeedRecord(parsedFeed, summaries=False, seenKeys=()):
+	#boil a FeedParserDict down to a FeedRecord. With summaries, entries
+	#whose keys aren't in seenKeys keep their summary.
+	feed = parsedFeed.get("feed", {})
+	return FeedRecord(parsedFeed.get("version", ""), feed.get("title", ""), \
+		feed.get("link"), [makeEntryRecord(entry, summaries, seenKeys) \
+		for entry in parsedFeed.get("entries", [])], \
+		error=getErrorText(parsedFeed))
+#*** END OF makeFeedRecord() **************************************************
+
+
+def getErrorText(parsedFeed):
+	#feedparser's complaint about a feed, if it had one. Kept as text, since
+	#not all of its exceptions survive being pickled.
+	if parsedFeed.get("bozo_exception") is None:
+		return None
+	return str(parsedFeed["bozo_exception"])
+#*** END OF getErrorText() ****************************************************
+
+
+def makeEntryRecord(entry, summaries=False, seenKeys=()):
+	#boil one of feedparser's entries down to an EntryRecord.
+	record = EntryRecord(entry.get("title", ""), entry.get("link"), \
+		entry.get("id"), entry.get("updated_parsed"))
+	if summaries and not getEntryKey(record) in seenKeys:
+		record.summary = getSummaryText(entry.get("summary", ""))
+	return record
+#*** END OF makeEntryRecord() *************************************************
+
+
+#>>> SCHEDULING <<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<
+def getDueIndices(feedJSON, now=None):
+	#indices of the feeds whose "nextCheck" has come (or that have never been
+	#scheduled at all).
+	if now is None:
+		now = time.time()
+	due = []
+	for index, feedData in enumerate(feedJSON["feedList"]):
+		if getNextCheckTime(feedData) <= now:
+			due.append(index)
+	return due
+#*** END OF getDueIndices() ***************************************************
+
+
+def getSchedule(feedJSON):
+	#a heap of (next check time, index) for every feed in feedJSON.
+	schedule = [(getNextCheckTime(feedData), index) for index, feedData \
+		in enumerate(feedJSON["feedList"])]
+	heapq.heapify(schedule)
+	return schedule
+#*** END OF getSchedule() *****************************************************
+
+
+def getNextCheckTime(feedData):
+	#when a feed is next due, in seconds since the epoch. Feeds without a
+	#(readable) "nextCheck" are due right away.
+	try:
+		return dtToTime(strToDt(feedData["nextCheck"]))
+	except (KeyError, ValueError):
+		return 0
+#*** END OF getNextCheckTime() ************************************************
+
+
+def updatePostHistory(feedData, parsedFeed):
+	#add the gaps between the feed's new posts to its "postGaps" history,
+	#keeping only the last POST_GAP_HISTORY of them. Returns how many new
+	#timestamped posts there were.
+	#--- SETUP ----------------------------------------------------------------
+	#where we left off last time, if we know.
+	latest = None
+	if "latestTimeStamp" in feedData:
+		try:
+			latest = dtToTime(strToDt(feedData["latestTimeStamp"]))
+		except ValueError:
+			pass
+	
+	#--- MAIN CODE ------------------------------------------------------------
+	stamps = []
+	for entry in parsedFeed.entries:
+		if entry.updated_parsed is not None:
+			stamp = time.mktime(entry.updated_parsed)
+			if latest is None or stamp > latest:
+				stamps.append(stamp)
+	newPosts = len(stamps)
+	
+	#the gap between the last post we knew about and the first new one
+	#counts too.
+	if latest is not None and newPosts > 0:
+		stamps.append(latest)
+	stamps.sort()
+	
+	postGaps = feedData.get("postGaps", [])
+	for older, newer in zip(stamps, stamps[1:]):
+		postGaps.append(int(newer - older))
+	feedData["postGaps"] = postGaps[-POST_GAP_HISTORY:]
+	return newPosts
+#*** END OF updatePostHistory() ***********************************************
+
+
+def updatePollSchedule(feedData, reachable, newPosts=0):
+	#keep count of back-to-back failures and quiet checks, then work out when
+	#the feed should be checked next and store it as "nextCheck".
+	if reachable:
+		feedData["failCount"] = 0
+		if newPosts > 0:
+			feedData["idleChecks"] = 0
+		else:
+			feedData["idleChecks"] = feedData.get("idleChecks", 0) + 1
+	else:
+		feedData["failCount"] = feedData.get("failCount", 0) + 1
+	
+	nextCheck = datetime.now() + timedelta(seconds=getPollInterval(feedData))
+	feedData["nextCheck"] = datetime.strftime(trimDatetime_ms(nextCheck), \
+		"%Y-%m-%d %H:%M:%S")
+#*** END OF updatePollSchedule() **********************************************
+
+
+def getPollInterval(feedData):
+	#how many seconds to wait before checking a feed again.
+	#The feed's urgency sets the base interval. Feeds with a post history are
+	#checked about twice per typical gap between posts, feeds that stay quiet
+	#slowly back off, and feeds that keep failing back off quickly. Nothing
+	#waits longer than MAX_POLL_INTERVAL.
+	base = POLL_INTERVALS.get(feedData.get("urgency"), POLL_INTERVALS[1])
+	
+	failCount = feedData.get("failCount", 0)
+	if failCount > 0:
+		return min(base * 2 ** failCount, MAX_POLL_INTERVAL)
+	
+	#the median ignores the odd burst of posts or long holiday.
+	postGaps = sorted(feedData.get("postGaps", []))
+	if len(postGaps) > 0:
+		interval = max(postGaps[len(postGaps) // 2] / 2, base / 2)
+	else:
+		interval = base
+	
+	idleChecks = min(feedData.get("idleChecks", 0), 8)
+	return min(interval * IDLE_BACKOFF ** idleChecks, MAX_POLL_INTERVAL)
+#*** END OF getPollInterval() *************************************************
+
+
+def getHostBreakers(feedJSON, indices):
+	#a rssFetch.CircuitBreaker for the host of each feed in indices, picking
+	#up where the saved "hostBreakers" left off.
+	from rssFetch import CircuitBreaker
+	savedBreakers = feedJSON.get("hostBreakers", {})
+	breakers = {}
+	for index in indices:
+		host = getFeedHost(getFetchUrl(feedJSON["feedList"][index]))
+		#(local files have no host to protect)
+		if host == "" or host in breakers:
+			continue
+		saved = savedBreakers.get(host, {})
+		try:
+			openUntil = dtToTime(strToDt(saved["openUntil"]))
+		except (KeyError, ValueError):
+			openUntil = 0.0
+		breakers[host] = CircuitBreaker(saved.get("failCount", 0), \
+			saved.get("trips", 0), openUntil)
+	return breakers
+#*** END OF getHostBreakers() *************************************************
+
+
+def saveHostBreakers(feedJSON, breakers):
+	#store breakers back in feedJSON's "hostBreakers". Hosts with nothing
+	#against them are left out, so it only ever holds the troublemakers.
+	savedBreakers = feedJSON.get("hostBreakers", {})
+	#(and drops any saved with a url's user:password@ still in the key)
+	for host in [host for host in savedBreakers if "@" in host]:
+		del savedBreakers[host]
+	for host, breaker in breakers.items():
+		if breaker.isClosed():
+			savedBreakers.pop(host, None)
+			continue
+		savedBreakers[host] = {"failCount": breaker.failCount, \
+			"trips": breaker.trips, \
+			"openUntil": timeToStr(time.localtime(breaker.openUntil))}
+	if len(savedBreakers) > 0:
+		feedJSON["hostBreakers"] = savedBreakers
+	else:
+		feedJSON.pop("hostBreakers", None)
+#*** END OF saveHostBreakers() ************************************************
 
-	#save the JSON structure
-	saveFeedJSON(filePath, feedJSON)
-#*** END OF checkFeeds() ******************************************************
 
 #>>> LOADING/SAVING DATA <<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<
-def loadFeeds(filePath):
+def loadFeeds(filePath, workers=FETCH_WORKERS, hostLimit=HOST_LIMIT, \
+	timeout=FETCH_TIMEOUT, deadline=RUN_DEADLINE):
 	#load the .TXT file as a JSON structure into feedJSON, then parses the 
 	#feeds via feedparser into parsedFeeds. Returns a tuple.
+	#feeds which timed out are None in parsedFeeds.
 	
-	#the unparsed JSON data - check it for missing info immediatly
-	feedJSON = loadJSON(filePath)
-	feedJSON = JSONDataFaultCheck(feedJSON)
+	#the unparsed JSON data, already checked for missing info
+	feedJSON = loadFeedJSON(filePath)
 	
 	#a list of parsed feeds. Will NOT contain any data from the JSON
-	parsedFeeds = []
-	
-	#parse the urls in the json structure as feeds
-	for index, feedData in enumerate(feedJSON["feedList"]):
-		#print a progress counter. It overwrites itself as the count goes up.
-		#I'm kinda proud of this one. :)
-		print("parsing feed %i/%i  "  %\
-			(index + 1,len(feedJSON["feedList"])), end="\r")
-		
-		#check feedData for missing info (ie. the URL) before parseing the feed
-		feedData = feedDataFaultCheck(feedData)
-		
-		#parse the feed - feedparser can handle bad urls, it 
-		#this step takes a little while.
-		parsedFeed = feedparser.parse(feedData["url"])
-		
-		#parsedFeed should ALWAYS have version as an attribute
-		if parsedFeed.version == "": #implies invalid feed URL (not a feed)
-			#the following includes index and the url.
-			logging.warning("Target URL is not a feed! INDEX: %i\n\t%s" % (index,feedData["url"]))
-			#not the time for an error. This is checked again in "getNewEntries()"
-			#raise RuntimeError("[%s] is not an actual feed." % feedData["url"])
-		else: #update the data stored in the JSON file from the parsed feed
-			feedData = updateFeedData(feedData, parsedFeed)
-
-		parsedFeeds.append(parsedFeed)
-	#--- END OF FOR LOOP ------------------------------------------------------
-	logging.info("%i feeds parsed!" %len(feedJSON["feedList"]))
+	#this step takes a little while.
+	parsedFeeds = refreshFeeds(feedJSON, None, workers, hostLimit, timeout, \
+		deadline)
 
 	#return a tuple of the json list and the parsed feed list
 	return(feedJSON, parsedFeeds)
 #*** END OF loadFeeds() *******************************************************
 
 
-def loadJSON(filePath):
-	#This function is used to load the feeds.TXT file as a JSON structure.
-	#It will throw an error if it cannot load the file.
+def loadFeedJSON(filePath):
+	#loadJSON(), then fill in anything missing from feedJSON and from each
+	#feedData (ie. the URL) so the rest of the code can rely on it.
+	with rssMetrics.span("load"):
+		feedJSON = loadJSON(filePath)
+		feedJSON = JSONDataFaultCheck(feedJSON)
+		for feedData in feedJSON["feedList"]:
+			feedDataFaultCheck(feedData)
+	return feedJSON
+#*** END OF loadFeedJSON() ****************************************************
+
+
+def refreshFeeds(feedJSON, indices=None, workers=FETCH_WORKERS, \
+	hostLimit=HOST_LIMIT, timeout=FETCH_TIMEOUT, deadline=RUN_DEADLINE, \
+	pool=None, onFetched=None, keep=True):
+	#fetches the feeds in indices (all of them by default) and updates their
+	#feedData from what came back. Returns parsedFeeds, with None for every
+	#feed that wasn't fetched or timed out (keep is passed to fetchFeeds).
+	#every feed fetched here also gets its next check scheduled, and each
+	#host's circuit breaker is saved in feedJSON (see getHostBreakers).
+	#onFetched(index, parsedFeed) is called for each feed that does arrive,
+	#as soon as its feedData has been updated.
+	if indices is None:
+		indices = range(len(feedJSON["feedList"]))
+	
+	def refreshFetched(index, parsedFeed):
+		#(this runs while the fetch is still going, but it's checking)
+		with rssMetrics.pause("fetch"), rssMetrics.span("check"):
+			refreshFeed(feedJSON["feedList"][index], parsedFeed, index)
+			if onFetched is not None:
+				onFetched(index, parsedFeed)
+	
+	breakers = getHostBreakers(feedJSON, indices)
+	with rssMetrics.span("fetch"):
+		parsedFeeds = fetchFeeds(feedJSON["feedList"], workers, hostLimit, \
+			timeout, deadline, indices, pool, refreshFetched, breakers, keep)
+	saveHostBreakers(feedJSON, breakers)
+	
+	#a timeout has no body. Keep what we had stored for the feed.
+	timedOut = 0
+	for index in indices:
+		if parsedFeeds[index] is None:
+			logging.warning("Feed timed out! INDEX: %i\n\t%s" % \
+				(index,feedJSON["feedList"][index]["url"]))
+			timedOut = timedOut + 1
+			updatePollSchedule(feedJSON["feedList"][index], False)
+	logging.info("%i feeds parsed!" % (len(indices) - timedOut))
+	
+	return parsedFeeds
+#*** END OF refreshFeeds() ****************************************************
+
+
+def refreshFeed(feedData, parsedFeed, index):
+	#updates one feedData from its (non-None) parsedFeed. See refreshFeeds.
+	#a feed that's permanently moved is fetched from its new home from now
+	#on. "url" is left alone - it's what the user knows the feed by.
+	if parsedFeed.movedTo is not None and \
+		parsedFeed.movedTo != feedData.get("movedTo"):
+		logging.info("Feed moved! INDEX: %i\n\t%s\n\t-> %s" % \
+			(index, feedData["url"], parsedFeed.movedTo))
+		feedData["movedTo"] = parsedFeed.movedTo
+	
+	#a feed that was skipped isn't due again until its host can be tried.
+	if isSkipped(parsedFeed):
+		feedData["nextCheck"] = parsedFeed.skippedUntil
+		return
+	
+	#a 304 has no body. Keep what we had stored for the feed.
+	if isNotModified(parsedFeed):
+		updatePollSchedule(feedData, True)
+		return
 	
-	#write another try/catch: FileNotFoundError
+	#parsedFeed should ALWAYS have version as an attribute
+	if parsedFeed.version == "": #implies invalid feed URL (not a feed)
+		#the following includes index and the url.
+		logging.warning("Target URL is not a feed! INDEX: %i\n\t%s" % \
+			(index,feedData["url"]))
+		#not the time for an error. This is checked again in "getNewEntries()"
+		#raise RuntimeError("[%s] is not an actual feed." % feedData["url"])
+		updatePollSchedule(feedData, False)
+	else: #update the data stored in the JSON file from the parsed feed
+		#(the post history has to go first - it compares against the
+		#timestamp checkParsedFeeds() is about to overwrite.)
+		newPosts = updatePostHistory(feedData, parsedFeed)
+		updatePollSchedule(feedData, True, newPosts)
+		updateFeedData(feedData, parsedFeed)
+#*** END OF refreshFeed() *****************************************************
+
+
+def fetchFeeds(feedList, workers=FETCH_WORKERS, hostLimit=HOST_LIMIT, \
+	timeout=FETCH_TIMEOUT, deadline=RUN_DEADLINE, indices=None, pool=None, \
+	onFetched=None, breakers=None, keep=True):
+	#parses every feed in feedList through a pool of worker threads, so one
+	#slow host doesn't hold up the rest. Returns a list of parsed feeds where
+	#parsedFeeds[index] belongs to feedList[index], no matter which order the
+	#downloads actually finish in.
+	#timeout applies to each connect/read. Anything still outstanding once
+	#deadline seconds have passed is abandoned and left as None.
+	#indices limits the fetch to some of the feeds (the rest are None), and
+	#pool lets a long-running caller keep its worker threads between runs.
+	#if PARSE_WORKERS is set the threads only download, and the parsing is
+	#done by getParsePool().
+	#onFetched(index, parsedFeed) is called (on this thread) for each feed
+	#as it comes back, unless it timed out. Without keep, parsedFeeds only
+	#says which feeds arrived (True), and each parsedFeed is let go of as
+	#soon as onFetched is done with it - so a run that checks as it goes
+	#only ever holds the feeds still in flight.
+	#feeds with the same canonical url are only fetched once, and every one
+	#of them gets the parsedFeed (see getFeedGroups).
+	#breakers is {host: rssFetch.CircuitBreaker}. The feeds of a host whose
+	#breaker is open aren't fetched (see getSkippedFeed). With a hostLimit,
+	#each host also gets a rssFetch.TokenBucket.
+	
+	#--- SETUP ----------------------------------------------------------------
+	#fill in the slots as the feeds come back.
+	parsedFeeds = [None] * len(feedList)
+	
+	#when the whole run has to be wrapped up (None means never)
+	deadlineAt = None
+	if deadline > 0:
+		deadlineAt = time.monotonic() + deadline
+	
+	if indices is None:
+		indices = range(len(feedList))
+	groups = getFeedGroups(feedList, indices)
+	
+	#one semaphore (and token bucket) per host keeps us from hammering a
+	#single server.
+	hostLocks = {}
+	buckets = {}
+	if hostLimit > 0:
+		from rssFetch import TokenBucket
+		for group in groups:
+			host = getFeedHost(getFetchUrl(feedList[group[0]]))
+			if not host in hostLocks:
+				hostLocks[host] = threading.Semaphore(hostLimit)
+				buckets[host] = TokenBucket()
+	if breakers is None:
+		breakers = {}
+	
+	#--- MAIN CODE ------------------------------------------------------------
+	#(start the parse pool here rather than from inside a fetching thread)
+	parsePool = getParsePool()
+	ownPool = pool is None
+	if ownPool:
+		pool = ThreadPoolExecutor(max_workers=max(1, workers))
+	futures = {}
+	#(finished futures are handed over through a queue rather than
+	#as_completed(), which would hold on to every one - and its parsedFeed -
+	#until the last had finished.)
+	finished = queue.SimpleQueue()
+	for group in groups:
+		feedData = getGroupFeedData(feedList, group)
+		host = getFeedHost(getFetchUrl(feedData))
+		future = pool.submit(fetchFeed, feedData, hostLocks.get(host), \
+			timeout, deadlineAt, parsePool, buckets.get(host), \
+			breakers.get(host))
+		futures[future] = group
+		future.add_done_callback(finished.put)
+	
+	total = len(futures)
 	try:
-		with open(filePath, 'r') as store:
-			feedJSON = json.load(store)
-	except FileNotFoundError:
-		raise RuntimeError("Couldn't find feeds.txt!")
-	except ValueError as error:
-		raise RuntimeError("Bad JSON: %s" % str(error))
+		for count in range(total):
+			remaining = None
+			if deadlineAt is not None:
+				remaining = max(0, deadlineAt - time.monotonic())
+			future = finished.get(timeout=remaining)
+			#print a progress counter. It overwrites itself as the count goes
+			#up. I'm kinda proud of this one. :)
+			print("parsing feed %i/%i  "  % (count + 1, total), end="\r")
+			parsedFeed = future.result()
+			for index in futures.pop(future):
+				parsedFeeds[index] = parsedFeed
+				if onFetched is not None and parsedFeed is not None:
+					onFetched(index, parsedFeed)
+				if not keep and parsedFeed is not None:
+					parsedFeeds[index] = True
+	except queue.Empty:
+		logging.warning("Deadline of %is reached, %i feeds not fetched." % \
+			(deadline, len(futures)))
+	finally:
+		#don't wait around for stragglers - their sockets time out on their own.
+		if ownPool:
+			pool.shutdown(wait=False, cancel_futures=True)
+		else:
+			for future in futures:
+				future.cancel()
+	
+	return parsedFeeds
+#*** END OF fetchFeeds() ******************************************************
+
+
+def getFeedGroups(feedList, indices):
+	#the feeds in indices grouped by canonical url (see getCanonicalUrl), as a
+	#list of lists of indices in feedList order. Feeds that have moved are
+	#grouped by where they moved to.
+	groups = {}
+	for index in indices:
+		key = getCanonicalUrl(getFetchUrl(feedList[index]))
+		groups.setdefault(key, []).append(index)
+	return list(groups.values())
+#*** END OF getFeedGroups() ***************************************************
+
+
+def getDuplicateCount(feedJSON, indices=None):
+	#(feeds in indices, how many of them share another one's fetch)
+	if indices is None:
+		indices = range(len(feedJSON["feedList"]))
+	return (len(indices), \
+		len(indices) - len(getFeedGroups(feedJSON["feedList"], indices)))
+#*** END OF getDuplicateCount() ***********************************************
+
+
+def getGroupFeedData(feedList, group):
+	#the feedData to fetch a group of duplicate feeds with. The validators
+	#(and the seen entries streamFeed() stops at) are only sent if every
+	#feed in the group agrees on them - otherwise one copy's 304 would hide
+	#entries another copy hasn't seen yet.
+	if len(group) == 1:
+		return feedList[group[0]]
+	feedData = dict(feedList[group[0]])
+	for key in ("etag", "modified", "seenEntries"):
+		if len(set([feedList[index].get(key) for index in group])) > 1:
+			feedData.pop(key, None)
+	return feedData
+#*** END OF getGroupFeedData() ************************************************
+
+
+def fetchFeed(feedData, hostLock=None, timeout=FETCH_TIMEOUT, deadlineAt=None, \
+	parsePool=None, bucket=None, breaker=None):
+	#download and parse a single feed, holding hostLock (if there is one)
+	#while talking to the host. Returns None if the feed timed out.
+	#bucket (a rssFetch.TokenBucket) spaces out the requests to the host,
+	#and if breaker (a rssFetch.CircuitBreaker) is open the host isn't asked
+	#at all. How the fetch went is recorded in breaker.
+	if breaker is not None and not breaker.allow():
+		return getSkippedFeed(breaker)
+	if hostLock is None:
+		parsedFeed = downloadFeed(feedData, timeout, deadlineAt, parsePool)
 	else:
-		return feedJSON
+		with hostLock:
+			#(the breaker may have opened while we waited our turn)
+			if breaker is not None and not breaker.allow():
+				return getSkippedFeed(breaker)
+			if bucket is not None and not bucket.acquire(deadlineAt):
+				return None
+			parsedFeed = downloadFeed(feedData, timeout, deadlineAt, parsePool)
+	
+	#running out of run isn't the host's fault.
+	if breaker is not None and (parsedFeed is not None or deadlineAt is None \
+		or time.monotonic() < deadlineAt):
+		breaker.record(isHostFailure(parsedFeed))
+	return parsedFeed
+#*** END OF fetchFeed() *******************************************************
+
+
+def downloadFeed(feedData, timeout=FETCH_TIMEOUT, deadlineAt=None, \
+	parsePool=None):
+	#fetch the feed with the shared fetcher (see rssFetch.py - feedparser
+	#can't time out or keep connections alive on its own) and hand the body
+	#to feedparser. Bad urls and HTTP errors come back as an empty feed,
+	#just like feedparser.parse(url) would give.
+	#the validators from the last fetch are sent along, so an unchanged feed
+	#comes back as an empty 304 instead of the whole document.
+	#with a parsePool, the body is parsed in another process.
+	#a feed is fetched from wherever it has permanently moved to, and a new
+	#301/308 is noted in the FeedRecord's movedTo.
+	
+	#don't start anything new once the run is out of time, and don't let a
+	#single read run past the deadline either.
+	if deadlineAt is not None:
+		timeout = min(timeout, deadlineAt - time.monotonic())
+		if timeout <= 0:
+			return None
+	
+	#the fetcher only does http(s). feedparser opens anything else (file://
+	#urls, local paths...) itself, as it always has.
+	fetchUrl = getFetchUrl(feedData)
+	if not urlsplit(fetchUrl).scheme in ("http", "https"):
+		parsedFeed = parseFeedBody(fetchUrl, {}, ARCHIVE_ENTRIES, \
+			set(feedData.get("seenEntries", "").split()))
+		parsedFeed.href = fetchUrl
+		return parsedFeed
+	
+	#(the fetcher, like feedparser, is only imported once there's a fetch)
+	from rssFetch import getFetcher
+	requestHeaders = {"User-Agent": loadFeedparser().USER_AGENT}
+	if "etag" in feedData:
+		requestHeaders["If-None-Match"] = feedData["etag"]
+	if "modified" in feedData:
+		requestHeaders["If-Modified-Since"] = feedData["modified"]
+	
+	#(for rssMetrics - the stream parser's time counts as reading)
+	started = time.perf_counter()
+	try:
+		with getFetcher().fetch(fetchUrl, requestHeaders, timeout) as response:
+			connected = time.perf_counter()
+			status = response.status
+			headers = response.headers
+			href = response.url
+			movedTo = getPermanentUrl(response.redirects)
+			if status >= 300:
+				#304, or an error. Either way there's nothing to parse.
+				response.close(True)
+				rssMetrics.recordFeed(feedData["url"], status=status, \
+					connectSeconds=connected - started)
+				if status == 304:
+					parsedFeed = FeedRecord(status=304)
+				else:
+					parsedFeed = getEmptyFeed("HTTP Error %i: %s" % \
+						(status, response.reason), status)
+				parsedFeed.movedTo = movedTo
+				return parsedFeed
+			#read in chunks so a host trickling bytes at us can't keep the
+			#feed going past the deadline. Feeds we've seen before can be
+			#streamed, which stops reading soon after the first entry we know.
+			chunks = readChunks(response, deadlineAt)
+			parsedFeed = None
+			seenKeys = set(feedData.get("seenEntries", "").split())
+			#relative links in the feed are resolved against where it really
+			#lives (both parsers have to agree, or the entry keys won't).
+			baseUrl = getResolvedUrl(href, headers.get("content-location", ""))
+			if STREAM_PARSE and "seenEntries" in feedData:
+				body, parsedFeed = streamFeed(chunks, seenKeys, baseUrl, \
+					ARCHIVE_ENTRIES)
+			else:
+				body = b"".join(chunks)
+			read = time.perf_counter()
+	except (socket.timeout, TimeoutError):
+		return None
+	except (OSError, ValueError) as error:
+		#connection resets, unknown hosts, malformed urls, bad gzip, ect.
+		return getEmptyFeed(error)
+	
+	if parsedFeed is None:
+		headers["content-location"] = baseUrl
+		if parsePool is None:
+			parsedFeed = parseFeedBody(body, headers, ARCHIVE_ENTRIES, seenKeys)
+		else:
+			remaining = None
+			if deadlineAt is not None:
+				remaining = max(0, deadlineAt - time.monotonic())
+			try:
+				parsedFeed = parsePool.submit(parseFeedBody, body, \
+					headers, ARCHIVE_ENTRIES, seenKeys).result(remaining)
+			except FuturesTimeout:
+				return None
+			except BrokenExecutor as error:
+				#a worker died (killed, out of memory...) and took the pool
+				#with it. Parse this one here and start a new pool next run.
+				logging.error("Parse pool broken: %s" % str(error))
+				closeParsePool(parsePool)
+				parsedFeed = parseFeedBody(body, headers, ARCHIVE_ENTRIES, \
+					seenKeys)
+		parsedFeed.bytes = len(body)
+	rssMetrics.recordFeed(feedData["url"], status=status, \
+		bytes=parsedFeed.bytes, connectSeconds=connected - started, \
+		readSeconds=read - connected, \
+		parseSeconds=time.perf_counter() - read, \
+		entries=len(parsedFeed.entries))
+	parsedFeed.status = status
+	parsedFeed.href = href
+	parsedFeed.etag = headers.get("etag")
+	parsedFeed.modified = headers.get("last-modified")
+	parsedFeed.movedTo = movedTo
+	return parsedFeed
+#*** END OF downloadFeed() ****************************************************
+
+
+def getPermanentUrl(redirects):
+	#where a fetch's redirects say the feed has moved for good: the end of the
+	#301/308s it started with (a temporary redirect stops the chain). None if
+	#it didn't start with one.
+	movedTo = None
+	for status, url in redirects:
+		if not status in (301, 308):
+			break
+		movedTo = url
+	return movedTo
+#*** END OF getPermanentUrl() *************************************************
+
+
+def getParsePool():
+	#the process pool used to parse feeds, started the first time it's needed
+	#and kept for the life of the program. None if PARSE_WORKERS is 0.
+	global parsePool
+	if PARSE_WORKERS > 0 and parsePool is None:
+		#(multiprocessing is only imported when there's a pool to start)
+		import atexit, multiprocessing
+		from concurrent.futures import ProcessPoolExecutor
+		#"spawn", because forking while the fetch threads are running isn't
+		#safe.
+		parsePool = ProcessPoolExecutor(max_workers=PARSE_WORKERS, \
+			mp_context=multiprocessing.get_context("spawn"))
+		#shut it down while the interpreter is still whole, or its clean up
+		#runs during the module teardown and fails noisily.
+		atexit.register(closeParsePool, parsePool)
+	return parsePool
+#*** END OF getParsePool() ****************************************************
+
+
+def closeParsePool(pool):
+	#shuts pool down, and if it's still the parse pool lets getParsePool()
+	#start a new one next time (ie. after a worker died and broke it).
+	global parsePool
+	if parsePool is pool:
+		parsePool = None
+	pool.shutdown(wait=False, cancel_futures=True)
+#*** END OF closeParsePool() **************************************************
+
+
+def parseFeedBody(body, headers, summaries=False, seenKeys=()):
+	#parse a downloaded feed with feedparser and boil it down to a
+	#FeedRecord, letting go of everything else (content, summaries and all)
+	#straight away. Also runs in the parse workers, where it keeps us from
+	#pickling the whole FeedParserDict back across processes.
+	#summaries keeps the summaries of entries not in seenKeys, for the
+	#archive (see makeFeedRecord). body can also be a file:// url or a path
+	#for feedparser to open.
+	return makeFeedRecord(loadFeedparser().parse(body, \
+		response_headers=headers), summaries, seenKeys)
+#*** END OF parseFeedBody() ***************************************************
+
+
+def readChunks(response, deadlineAt=None):
+	#yields the body of response a chunk at a time. Raises TimeoutError if
+	#the deadline passes before it's done.
+	chunk = response.read(65536)
+	while chunk:
+		if deadlineAt is not None and time.monotonic() > deadlineAt:
+			raise TimeoutError("deadline reached while reading")
+		yield chunk
+		chunk = response.read(65536)
+#*** END OF readChunks() ******************************************************
+
+
+def streamFeed(chunks, seenKeys, baseUrl="", summaries=False):
+	#parses a feed as its chunks arrive instead of all at once, and stops
+	#reading once it has finished STREAM_OVERLAP entries in a row whose keys
+	#are in seenKeys (so a new entry just below the first known one is still
+	#found). The known entries are kept, so entries[0] is still the newest
+	#entry and a feed with nothing new isn't mistaken for an empty one.
+	#ids and links are resolved against baseUrl and any xml:base, just as
+	#feedparser does - see getStreamedEntry().
+	#summaries keeps each entry's summary (see getStreamedEntry).
+	#Returns (body, parsedFeed). If the document can't be streamed (bad XML,
+	#HTML entities, not RSS/Atom at all...) parsedFeed is None and body is the
+	#whole document for feedparser to deal with instead.
+	#NOTE: this assumes the newest entries come first, like nearly every feed.
+	#--- SETUP ----------------------------------------------------------------
+	parser = ElementTree.XMLPullParser(events=("start", "end"))
+	consumed = []		#the chunks read so far, in case we have to fall back
+	elements = []		#the elements we're currently inside of
+	known = 0			#known entries in a row
+	parsedFeed = FeedRecord()
+	
+	#--- MAIN CODE ------------------------------------------------------------
+	try:
+		for chunk in chunks:
+			consumed.append(chunk)
+			parser.feed(chunk)
+			for event, element in parser.read_events():
+				name = getLocalName(element.tag)
+				if event == "start":
+					#the root element tells us what kind of feed this is.
+					if parsedFeed.version == "":
+						parsedFeed.version = getStreamVersion(element)
+						if parsedFeed.version is None:
+							raise ElementTree.ParseError("not a feed")
+					#note the base url every element is resolved against.
+					parentBase = baseUrl
+					if len(elements) > 0:
+						parentBase = elements[-1].get(XML_BASE)
+					element.set(XML_BASE, getResolvedUrl(parentBase, \
+						element.get(XML_BASE, element.get("base", ""))))
+					elements.append(element)
+					continue
+				
+				elements.pop()
+				parentName = ""
+				if len(elements) > 0:
+					parentName = getLocalName(elements[-1].tag)
+				
+				if name in ("item", "entry"):
+					entry = getStreamedEntry(element, summaries)
+					parsedFeed.entries.append(entry)
+					#let go of the entry's elements as we go.
+					if len(elements) > 0:
+						elements[-1].remove(element)
+					if not getEntryKey(entry) in seenKeys:
+						known = 0
+						continue
+					known = known + 1
+					if known >= STREAM_OVERLAP:
+						#the rest of the feed is old news.
+						parsedFeed.partial = True
+						return (b"", parsedFeed)
+				elif parentName in ("channel", "feed") and \
+					getNamespace(element.tag) in FEED_NAMESPACES:
+					if name == "title" and parsedFeed.title == "":
+						parsedFeed.title = (element.text or "").strip()
+					elif name == "link" and parsedFeed.link is None:
+						parsedFeed.link = getStreamedLink(element) or None
+		parser.close()
+	except ElementTree.ParseError:
+		return (b"".join(consumed) + b"".join(chunks), None)
+	
+	#got to the end without meeting an entry we knew about.
+	parsedFeed.bytes = sum(len(chunk) for chunk in consumed)
+	return (b"", parsedFeed)
+#*** END OF streamFeed() ******************************************************
+
+
+def getStreamVersion(root):
+	#a feedparser style version for a feed's root element, or None if it
+	#isn't RSS or Atom.
+	name = getLocalName(root.tag)
+	if name == "rss":
+		return "rss" + root.get("version", "20").replace(".", "")
+	elif name == "feed":
+		return "atom10"
+	elif name == "RDF":
+		return "rss10"
+	return None
+#*** END OF getStreamVersion() ************************************************
+
+
+def getStreamedEntry(element, summaries=False):
+	#pulls the fields the checker uses out of an RSS <item> or Atom <entry>
+	#into an EntryRecord. With summaries, the summary too (falling back on
+	#the content, as feedparser does).
+	#ids and links come out exactly as feedparser would have them, or the
+	#entry keys of the two parsers wouldn't match (see getEntryKey):
+	#- a <guid> (or Atom <id>) is a permalink unless isPermaLink says
+	#  otherwise. Only a permalink is resolved against the base url, and the
+	#  first one is the link if the entry has no <link> of its own.
+	#- the last <link> wins, and an Atom link only counts if it's an html
+	#  alternate.
+	#- RSS 1.0's rdf:about is the id if there's no <guid>, and is never
+	#  resolved.
+	#every element's base url is in its xml:base (see streamFeed).
+	entry = EntryRecord()
+	permalink = None
+	dates = {}
+	texts = {}
+	for child in element:
+		name = getLocalName(child.tag)
+		isOwn = getNamespace(child.tag) in FEED_NAMESPACES
+		text = (child.text or "").strip()
+		if isOwn and name == "title":
+			entry.title = text
+		elif isOwn and name == "link":
+			link = getStreamedLink(child)
+			if link:
+				entry.link = getResolvedUrl(child.get(XML_BASE), link)
+		elif isOwn and name in ("guid", "id"):
+			entry.id = text
+			if child.get("isPermaLink", "true") == "true" and text != "":
+				entry.id = getResolvedUrl(child.get(XML_BASE), text)
+				if permalink is None:
+					permalink = entry.id
+		elif name in ("updated", "modified", "pubDate", "published", "date"):
+			dates[name] = text
+		elif summaries and name in ("description", "summary", "encoded", \
+			"content") and not name in texts:
+			#(xhtml content is elements, not text)
+			texts[name] = "".join(child.itertext())
+	
+	if summaries:
+		for name in ("description", "summary", "encoded", "content"):
+			if name in texts:
+				entry.summary = getSummaryText(texts[name])
+				break
+	
+	about = element.get("{http://www.w3.org/1999/02/22-rdf-syntax-ns#}about")
+	if about and entry.id is None:
+		entry.id = about
+	if entry.link is None:
+		entry.link = permalink
+	
+	#prefer when the entry was updated, then when it was published.
+	loadFeedparser()
+	for name in ("updated", "modified", "pubDate", "published", "date"):
+		if name in dates:
+			parsed = _parse_date(dates[name])
+			if parsed is not None:
+				entry.updated_parsed = parsed
+				break
+	return entry
+#*** END OF getStreamedEntry() ************************************************
+
+
+def getStreamedLink(element):
+	#RSS links are text, Atom links are an href (we want the alternate html
+	#one). "" if it isn't a link we want.
+	#(feedparser undoes the "&amp;"s some feeds double up in text links.)
+	href = element.get("href", element.get("url", element.get("uri")))
+	if not href:
+		text = (element.text or "").strip().replace("&amp;", "&")
+		return re.sub("&([A-Za-z0-9_]+);", r"&\g<1>", text)
+	if element.get("rel", "alternate").lower() != "alternate":
+		return ""
+	linkType = element.get("type", "text/html").lower()
+	if linkType in ("html", "xhtml", "text/html", "application/xhtml+xml"):
+		return href
+	return ""
+#*** END OF getStreamedLink() *************************************************
+
+
+def getResolvedUrl(base, url):
+	#url made absolute against base, the way feedparser does it (including
+	#its tidying of "http:///" and "" for a url urljoin chokes on).
+	url = re.sub("^([A-Za-z][A-Za-z0-9+-.]*://)(/*)(.*?)", r"\1\3", url)
+	try:
+		return urljoin(base or "", url)
+	except ValueError:
+		return ""
+#*** END OF getResolvedUrl() **************************************************
+
+
+def getNamespace(tag):
+	#"{namespace}name" -> "namespace" ("" if it hasn't got one)
+	if tag.startswith("{"):
+		return tag[1:].split("}", 1)[0]
+	return ""
+#*** END OF getNamespace() ****************************************************
+
+
+def getLocalName(tag):
+	#"{namespace}name" -> "name"
+	return tag.rsplit("}", 1)[-1]
+#*** END OF getLocalName() ****************************************************
+
+
+def getEmptyFeed(error, status=None):
+	#the FeedRecord for a feed we couldn't get at all. Like what feedparser
+	#would have returned, its version is "" and it has no entries.
+	return FeedRecord(status=status, error=str(error))
+#*** END OF getEmptyFeed() ****************************************************
+
+
+def getSkippedFeed(breaker):
+	#the FeedRecord for a feed that wasn't fetched because breaker is open.
+	skippedUntil = timeToStr(time.localtime(breaker.openUntil))
+	parsedFeed = FeedRecord(error="host is down, skipped until %s" % \
+		skippedUntil)
+	parsedFeed.skippedUntil = skippedUntil
+	return parsedFeed
+#*** END OF getSkippedFeed() **************************************************
+
+
+def loadJSON(filePath):
+	#This function is used to load the feed store (feeds.TXT file by default)
+	#as a JSON structure. The format depends on the file - see rssStore.py
+	#It will throw an error if it cannot load the file.
+	return loadStore(filePath)
 #*** END OF loadJSON() ********************************************************
 
 
 def saveFeedJSON(filePath, feedJSON):
-	#dumps feedJSON into a .TXT as a json structure
+	#dumps feedJSON into the feed store it came from
 	
 	#sort the list of feed data by class (may comment out as needed)
 	#feedJSON["feedList"] = sortJSONFeedListByClass(feedJSON["feedList"])
-	with open(filePath, 'w') as store:
-		json.dump(feedJSON,store, sort_keys=True, indent=4, separators=(',', ': '))
-#*** END OF saveFeedJSON() ********************************************************
+	with rssMetrics.span("save"):
+		saveStore(filePath, feedJSON)
+#*** END OF saveFeedJSON() ****************************************************
+
+
+def mergeFeedJSON(storedJSON, feedJSON, indices):
+	#for a store that was edited (ie. by rssCli.py) while the feeds in
+	#indices were being checked: storedJSON, the store as it is now, with
+	#the checked feeds' feedData from feedJSON put back in. Feeds are matched
+	#by url, not index, since an edit can move them. A checked feed that was
+	#removed stays removed, and a checked feed keeps its stored class and
+	#urgency in case they were changed. lastCheck, lastNotify and
+	#hostBreakers come from feedJSON. Returns storedJSON.
+	checked = {}
+	for index in indices:
+		feedData = feedJSON["feedList"][index]
+		checked.setdefault(feedData["url"], []).append(feedData)
+	
+	feedList = storedJSON["feedList"]
+	for position, storedData in enumerate(feedList):
+		#(the same url twice is matched up copy by copy)
+		copies = checked.get(storedData["url"], [])
+		if len(copies) == 0:
+			continue
+		feedData = copies.pop(0)
+		for key in ("class", "urgency"):
+			if key in storedData:
+				feedData[key] = storedData[key]
+		feedList[position] = feedData
+	
+	for key in ("lastCheck", "lastNotify", "hostBreakers"):
+		if key in feedJSON:
+			storedJSON[key] = feedJSON[key]
+	logging.info("The store was edited during the check, merged %i feeds" % \
+		len(indices))
+	return storedJSON
+#*** END OF mergeFeedJSON() ***************************************************
+
+
+def archiveFeedResults(filePath, feedResults):
+	#add the new entries in feedResults to the rssArchive.EntryArchive next
+	#to the store at filePath (unless ARCHIVE_ENTRIES is off). It's done in
+	#one go after the fetching, rather than feed by feed on the thread that
+	#hands out results while the fetch threads fight it for the GIL.
+	#A problem with the archive is logged rather than holding up the check.
+	#(entries replayed from a journal have no summary)
+	if not ARCHIVE_ENTRIES or len(feedResults) == 0:
+		return
+	from rssArchive import EntryArchive, getArchivePath
+	with rssMetrics.span("archive"):
+		try:
+			archive = EntryArchive(getArchivePath(filePath))
+			try:
+				archive.addFeedResults(feedResults)
+			finally:
+				archive.close()
+		except RuntimeError as error:
+			logging.error("Entries not archived: %s" % error)
+#*** END OF archiveFeedResults() **********************************************
+
+
+def getJournalRecord(index, feedData, feedResult=None):
+	#what the journal keeps for a checked feed: its feedData as it is now,
+	#and its new entries (if it had any) so they can still be reported.
+	record = {"index": index, "url": feedData["url"], "feedData": feedData}
+	if feedResult is not None:
+		record["result"] = getFeedResultJSON(feedResult)
+	return record
+#*** END OF getJournalRecord() ************************************************
+
+
+def replayJournal(feedJSON, journal, result, feedResults):
+	#applies what's in the journal of a run that didn't finish to feedJSON,
+	#and puts the new entries it found back into result and feedResults (by
+	#index). Returns the set of indices that don't need checking again.
+	#a record whose url doesn't match the feed at its index (the store was
+	#edited since) is ignored.
+	feedList = feedJSON["feedList"]
+	resumed = set()
+	for record in journal.replay():
+		index = record["index"]
+		if index >= len(feedList) or feedList[index]["url"] != record["url"]:
+			continue
+		feedList[index] = record["feedData"]
+		resumed.add(index)
+		if not "result" in record:
+			feedResults.pop(index, None)
+			continue
+		feedResults[index] = makeFeedResult(record["result"])
+	
+	for index, feedResult in feedResults.items():
+		result.totalTally = result.totalTally + getGroupShare(result, \
+			feedList[index], "totalTally", feedResult.count)
+	if len(resumed) > 0:
+		logging.warning("Resuming an unfinished run, %i feeds already checked" \
+			% len(resumed))
+	return resumed
+#*** END OF replayJournal() ***************************************************
 
 
 #>>> FUDGING WITH TIME & DATETIME <<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<
@@ -425,7 +1946,7 @@ def timeToDt(t):
 
 def dtToTime(t):
 	#easily convert datetime to time if you don't care about sub-seconds
-	return time.mktime(dt_obj.timetuple())
+	return time.mktime(t.timetuple())
 #*** END OF dtToTime() ********************************************************
 
 def timeToStr(t):
@@ -435,20 +1956,100 @@ def timeToStr(t):
 
 
 #>>> GETTING DATA <<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<
+def getStorePath(filePath=""):
+	#if filePath is "", use feeds.txt in the program's folder.
+	#either way, the path that comes back is normalized.
+	if filePath == "":
+		filePath = path.dirname(path.realpath(__file__)) + "/feeds.txt"
+	return path.abspath(filePath)
+#*** END OF getStorePath() ****************************************************
+
+
 def getFeedListString(filePath, title=True, url=True, checktime=False):
-	result = ""
+	result = []
 	for item in getFeedList(filePath):
 		if title:
-			result = result + "=== " + item["title"]
+			result.append("=== " + item.get("title", ""))
 		if url:
-			result = result + "\n	" + item["URL"]
+			result.append("\n	" + item.get("url", ""))
 		if checktime:
-			result = result + "\n	" + item["latestTimeStamp"]
-		result =  result + "\n"
-	return result.strip()
+			result.append("\n	" + item.get("latestTimeStamp", "never"))
+		result.append("\n")
+	return "".join(result).strip()
 #*** END OF getFeedListString() ***********************************************
 
 
+def isSkipped(parsedFeed):
+	#true if the feed wasn't fetched because its host is down.
+	return parsedFeed.skippedUntil is not None
+#*** END OF isSkipped() *******************************************************
+
+
+def isHostFailure(parsedFeed):
+	#true if a fetch says the host itself is in trouble: it timed out,
+	#couldn't be reached, or answered with a 5xx or 429 Too Many Requests.
+	#A 404 or a page that isn't a feed is the feed's problem, not the host's.
+	if parsedFeed is None:
+		return True
+	if parsedFeed.status is None:
+		return parsedFeed.version == "" and parsedFeed.error is not None
+	return parsedFeed.status >= 500 or parsedFeed.status == 429
+#*** END OF isHostFailure() ***************************************************
+
+
+def isNotModified(parsedFeed):
+	#true if the server answered our conditional GET with 304 Not Modified.
+	return parsedFeed.status == 304
+#*** END OF isNotModified() ***************************************************
+
+
+def getFeedHost(url):
+	#the host part of a url (host[:port]), used to group feeds living on the
+	#same server. Any user:password@ is left off - these end up in the store
+	#as "hostBreakers" keys.
+	return urlsplit(url).netloc.rpartition("@")[2].lower()
+#*** END OF getFeedHost() *****************************************************
+
+
+def getSummaryText(summary):
+	#an entry's summary as at most SUMMARY_CHARS of plain text: no tags, no
+	#entities, and no runs of whitespace.
+	text = " ".join(html.unescape(re.sub(r"<[^>]*>", " ", summary)).split())
+	if len(text) > SUMMARY_CHARS:
+		text = text[:SUMMARY_CHARS - 3].rstrip() + "..."
+	return text
+#*** END OF getSummaryText() **************************************************
+
+
+def getFetchUrl(feedData):
+	#where the feed is actually fetched from.
+	return feedData.get("movedTo") or feedData["url"]
+#*** END OF getFetchUrl() *****************************************************
+
+
+def getCanonicalUrl(url):
+	#a key that's the same for every spelling of the same feed url: the
+	#scheme (http or https), case of the host, default port, trailing slash
+	#and any #fragment don't count. The query string does.
+	#urls that aren't http(s) are left as they are.
+	try:
+		parts = urlsplit(url.strip())
+		port = parts.port
+	except ValueError:
+		return url
+	if not parts.scheme.lower() in ("http", "https") or not parts.hostname:
+		return url
+	host = parts.hostname
+	defaultPort = 443 if parts.scheme.lower() == "https" else 80
+	if port is not None and port != defaultPort:
+		host = "%s:%i" % (host, port)
+	key = "//" + host + parts.path.rstrip("/")
+	if parts.query != "":
+		key = key + "?" + parts.query
+	return key
+#*** END OF getCanonicalUrl() *************************************************
+
+
 def getFeedClass(feedData):
 	return feedData["class"]
 #*** END OF getFeedClass() ****************************************************
@@ -457,9 +2058,10 @@ def getFeedTitle(feedData):
 	return feedData["title"]
 #*** END OF getFeedTitle() ****************************************************
 
-def getFeedList(filePath):
-	#doesn't return all of feedJSON - just feedList
-	return loadJSON(filePath)["feedList"]
+def getFeedList(filePath, feedClass=None, urgency=None):
+	#doesn't return all of feedJSON - just feedList, optionally only the feeds
+	#with a given class and/or urgency.
+	return getFeedStore(filePath).getFeedList(feedClass, urgency)
 #*** END OF getFeedList() *****************************************************
 
 
@@ -523,7 +2125,7 @@ def feedDataFaultCheck(feedData):
 	if not "urgency" in feedData: #check for the feed's urgency
 		feedData["urgency"] = 1
 		#possible urgencies: 0=immediate; 1=daily; 2=weekly
-		#not yet implemented...
+		#used by the daemon to decide how often to check (POLL_INTERVALS)
 		
 	return feedData
 #*** END OF feedDataFaultCheck() **********************************************
@@ -531,20 +2133,61 @@ def feedDataFaultCheck(feedData):
 
 def updateFeedData(feedData, parsedFeed):
 	#updates a few things by pulling from the parsed feed.
-	#assumes that these items are present in parsedFeed.
-	#might add a try-except to protect against needless crashes
 
 	#update the feed title every time
-	if "title" in parsedFeed.feed:
-		feedData["title"] = parsedFeed.feed.title
+	if parsedFeed.title != "":
+		feedData["title"] = parsedFeed.title
 	
 	#if a home URL isn't saved, get one from the feed.
-	if feedData["url-home"] == "" and "link" in parsedFeed.feed:
-		feedData["url-home"] = parsedFeed.feed.link
+	if feedData["url-home"] == "" and parsedFeed.link is not None:
+		feedData["url-home"] = parsedFeed.link
+	
+	#remember the validators (and how big the feed was) for the next
+	#conditional GET. Drop old ones if the server stopped sending them.
+	for key, value in (("etag", parsedFeed.etag), \
+		("modified", parsedFeed.modified)):
+		if value is not None:
+			feedData[key] = value
+		else:
+			feedData.pop(key, None)
+	if parsedFeed.bytes is not None:
+		feedData["lastBytes"] = parsedFeed.bytes
 	return feedData
 #*** END OF updateFeedData() **************************************************
 
 
+def getEntryKey(entry):
+	#a short, stable hash identifying an entry. The id is best since it
+	#survives edits to the entry, then the link, then (if all else fails)
+	#the title.
+	key = entry.id or entry.link or entry.title
+	return hashlib.blake2b(key.encode("utf-8"), digest_size=8).hexdigest()
+#*** END OF getEntryKey() *****************************************************
+
+
+def updateSeenEntries(feedData, parsedFeed):
+	#add the keys of parsedFeed's entries to the feed's "seenEntries" ring.
+	#It's stored as one space-separated string to keep the store small. When
+	#it's full the oldest keys are dropped, but never the keys of entries the
+	#feed is still serving, or they'd be reported as new again.
+	#a partial (streamed) parsedFeed doesn't say which entries the feed still
+	#serves, so then nothing is dropped: the ring grows by the new keys and
+	#is only trimmed again after a full parse.
+	currentKeys = [getEntryKey(entry) for entry in reversed(parsedFeed.entries)]
+	current = set(currentKeys)
+	
+	#older keys first, then the current entries (the newest last).
+	oldKeys = feedData.get("seenEntries", "").split()
+	seenKeys = [key for key in oldKeys if not key in current]
+	seenKeys.extend(dict.fromkeys(currentKeys))
+	
+	if not parsedFeed.partial:
+		seenKeys = seenKeys[-max(SEEN_CAPACITY, len(current)):]
+	feedData["seenEntries"] = " ".join(seenKeys)
+	return feedData
+#*** END OF updateSeenEntries() ***********************************************
+
+
 def sortJSONFeedListByClass(feedJSON):
 	return sorted(feedJSON, key=getFeedClass)
 #*** END OF sortJSONFeedListByClass() *****************************************
@@ -567,4 +2210,17 @@ def rewriteTimestamps(feedJSON, newDate="1970-01-01 00:00:00"):
 #this allows the program to run on it's own. If the file is imported, then 
 #__name__ will be the module's name.
 if __name__ == "__main__":
-	main()
+	if len(sys.argv) > 1 and sys.argv[1] == "daemon":
+		runDaemon()
+	elif len(sys.argv) > 1 and sys.argv[1] == "jsonl":
+		#ie. python rssMonitor.py jsonl [- | FILE | unix:SOCKET]
+		streamCheck(sys.argv[2] if len(sys.argv) > 2 else "-")
+	elif len(sys.argv) > 1 and sys.argv[1] == "profile":
+		#one normal run under cProfile, ie. python rssMonitor.py profile
+		rssMetrics.profileRun(main, \
+			sys.argv[2] if len(sys.argv) > 2 else "rssMonitor.prof")
+	elif len(sys.argv) == 4 and sys.argv[1] == "migrate":
+		#ie. python rssMonitor.py migrate feeds.txt feeds.db
+		print("%i feeds copied." % migrateStore(sys.argv[2], sys.argv[3]))
+	else:
+		main()
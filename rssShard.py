@@ -0,0 +1,394 @@
+''' ~*~{O}~*~
+	rssShard.py
+	Comment:
+		Splits a big feed list across several checkers - processes or whole
+		machines - and merges what they find into one report.
+
+		Feeds are given to shards by consistent hashing on their url (see
+		ShardRing), so adding a shard only moves about 1/N of the feeds. Each
+		shard keeps its feeds (and their state) in a store of its own, ie.
+		feeds.txt -> feeds.shard1of4.txt, and checks it with an ordinary
+		checkFeeds(). The shards then hand their results to a coordinator,
+		which is either a directory every shard can write to or a socket.
+
+	USAGE:
+		python rssShard.py split [store] [shards]
+		python rssShard.py join [store] [shards]
+		python rssShard.py worker [store] [shard] [shards] [destination]
+		python rssShard.py coordinate [shards] [destination]
+		python rssShard.py local [store] [shards] [file|socket]
+
+		destination is a directory, "unix:PATH" or "tcp:HOST:PORT". shard
+		counts from 0. "local" runs every shard in its own process on this
+		machine, with a coordinator of the type given.
+		e.g. "python rssShard.py local feeds.txt 4 socket"
+'''
+
+import bisect, hashlib, json, logging, multiprocessing, os, socket, sys
+import tempfile, time
+from os import path
+
+import rssMonitor
+from rssStore import getFeedStore
+
+#points each shard gets on the ring. More points, more even shards.
+RING_REPLICAS = 64
+
+#how long the coordinator waits for every shard to report.
+COORDINATOR_TIMEOUT = rssMonitor.RUN_DEADLINE + 60
+
+def main():
+	command = sys.argv[1] if len(sys.argv) > 1 else ""
+	arguments = sys.argv[2:]
+	logging.basicConfig(filename='rssMonitor.log', level = logging.INFO)
+	if command == "split" and len(arguments) == 2:
+		print("%i feeds split into %s shards." % \
+			(splitStore(arguments[0], int(arguments[1])), arguments[1]))
+	elif command == "join" and len(arguments) == 2:
+		print("%i feeds joined." % joinStores(arguments[0], int(arguments[1])))
+	elif command == "worker" and len(arguments) == 4:
+		runShard(arguments[0], int(arguments[1]), int(arguments[2]), \
+			arguments[3])
+	elif command == "coordinate" and len(arguments) == 2:
+		printReport(*collectResults(arguments[1], int(arguments[0])))
+	elif command == "local" and len(arguments) >= 2:
+		printReport(*runLocal(arguments[0], int(arguments[1]), \
+			arguments[2] if len(arguments) > 2 else "file"))
+	else:
+		print(__doc__)
+#*** END OF MAIN **************************************************************
+
+
+def printReport(result, errors):
+	#prints a merged result the way rssMonitor.main() would.
+	for error in errors:
+		print("Shard failed: %s" % error, file=sys.stderr)
+	rssMonitor.writeCheckResult(result, sys.stdout, "=-=-=-=-=-=-=-=-=-=-=-=-=\n")
+#*** END OF printReport() *****************************************************
+
+
+#>>> CONSISTENT HASHING <<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<
+class ShardRing:
+	#each shard owns RING_REPLICAS points on a ring of 64 bit hashes, and a
+	#url belongs to whichever shard owns the next point along from the url's
+	#own hash. Every machine works out the same ring from shardCount alone.
+	def __init__(self, shardCount, replicas=RING_REPLICAS):
+		if shardCount < 1:
+			raise ValueError("need at least one shard")
+		points = sorted((getHash("shard-%i-%i" % (shard, replica)), shard) \
+			for shard in range(shardCount) for replica in range(replicas))
+		self.hashes = [point[0] for point in points]
+		self.shards = [point[1] for point in points]
+
+	def getShard(self, url):
+		position = bisect.bisect(self.hashes, getHash(url))
+		return self.shards[position % len(self.shards)]
+#*** END OF ShardRing *********************************************************
+
+
+def getHash(text):
+	return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), \
+		digest_size=8).digest(), "big")
+#*** END OF getHash() *********************************************************
+
+
+#>>> PARTITIONED STATE <<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<
+def getShardPath(filePath, shard, shardCount):
+	#feeds.txt -> feeds.shard0of4.txt. The extension stays last, so a
+	#shard of an SQLite store is still an SQLite store.
+	root, extension = path.splitext(filePath)
+	return "%s.shard%iof%i%s" % (root, shard, shardCount, extension)
+#*** END OF getShardPath() ****************************************************
+
+
+def splitStore(filePath, shardCount):
+	#writes each shard's store from the main one. Feeds the shard stores
+	#already have keep their stored state (it's newer than the main store's),
+	#so re-splitting after adding feeds to the main store loses nothing.
+	#Returns the number of feeds split.
+	feedJSON = rssMonitor.loadFeedJSON(filePath)
+	known = {}
+	for shard in range(shardCount):
+		shardPath = getShardPath(filePath, shard, shardCount)
+		if path.exists(shardPath):
+			for feedData in getFeedStore(shardPath).load()["feedList"]:
+				known[feedData["url"]] = feedData
+
+	ring = ShardRing(shardCount)
+	shardLists = [[] for shard in range(shardCount)]
+	for feedData in feedJSON["feedList"]:
+		shardLists[ring.getShard(feedData["url"])].append( \
+			known.get(feedData["url"], feedData))
+
+	for shard, feedList in enumerate(shardLists):
+		shardJSON = dict(feedJSON)
+		shardJSON["feedList"] = feedList
+		shardStore = getFeedStore(getShardPath(filePath, shard, shardCount))
+		shardStore.clear()
+		shardStore.save(shardJSON)
+	return len(feedJSON["feedList"])
+#*** END OF splitStore() ******************************************************
+
+
+def joinStores(filePath, shardCount):
+	#copies the state the shards have built up back into the main store, ie.
+	#to go back to checking with one process. Feeds only the main store has
+	#are left as they are. Returns the number of feeds updated.
+	feedJSON = rssMonitor.loadFeedJSON(filePath)
+	known = {}
+	for shard in range(shardCount):
+		shardPath = getShardPath(filePath, shard, shardCount)
+		for feedData in getFeedStore(shardPath).load()["feedList"]:
+			known[feedData["url"]] = feedData
+
+	feedList = feedJSON["feedList"]
+	joined = 0
+	for index, feedData in enumerate(feedList):
+		if feedData["url"] in known:
+			feedList[index] = known[feedData["url"]]
+			joined = joined + 1
+	rssMonitor.saveFeedJSON(filePath, feedJSON)
+	return joined
+#*** END OF joinStores() ******************************************************
+
+
+#>>> WORKERS <<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<
+def runShard(filePath, shard, shardCount, destination):
+	#check one shard's store and report to the coordinator at destination.
+	#a shard that can't be checked reports its error instead.
+	shardPath = getShardPath(filePath, shard, shardCount)
+	message = {"shard": shard, "shardCount": shardCount}
+	try:
+		result = rssMonitor.checkFeeds(shardPath)
+	except RuntimeError as error:
+		logging.critical("Shard %i: %s" % (shard, error))
+		message["error"] = str(error)
+	else:
+		message["result"] = getResultJSON(result)
+	sendResult(destination, message)
+#*** END OF runShard() ********************************************************
+
+
+def getResultJSON(result):
+	#a CheckResult as plain json-able data.
+	return {"totalTally": result.totalTally, "notModified": result.notModified, \
+		"bytesSaved": result.bytesSaved, "timedOut": result.timedOut, \
+		"skipped": result.skipped, "feedCount": result.feedCount, \
+		"duplicates": result.duplicates, \
+		"feedResults": [rssMonitor.getFeedResultJSON(feedResult) \
+		for feedResult in result.feedResults]}
+#*** END OF getResultJSON() ***************************************************
+
+
+def sendResult(destination, message):
+	#a directory gets the message as shardNofM.json (written to a temporary
+	#file first, so the coordinator never reads half of one). A socket gets
+	#it as one line of json.
+	data = json.dumps(message, sort_keys=True)
+	if destination.startswith("unix:") or destination.startswith("tcp:"):
+		connection = socket.socket(*getSocketType(destination))
+		try:
+			connection.connect(getSocketAddress(destination))
+			connection.sendall(data.encode("utf-8") + b"\n")
+		finally:
+			connection.close()
+		return
+
+	handle, tempPath = tempfile.mkstemp(prefix=".shard-", dir=destination)
+	with os.fdopen(handle, "w") as report:
+		report.write(data)
+	os.replace(tempPath, path.join(destination, "shard%iof%i.json" % \
+		(message["shard"], message["shardCount"])))
+#*** END OF sendResult() ******************************************************
+
+
+#>>> COORDINATOR <<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<
+def collectResults(destination, shardCount, timeout=COORDINATOR_TIMEOUT, \
+	listener=None):
+	#waits (up to timeout seconds) for every shard to report to destination
+	#and merges their results. Returns (CheckResult, errors), with an error
+	#for each shard that failed or never reported. Use getCheckResultTuple()
+	#on the result for the old (totalTally, heading, fullSummary, results).
+	#listener is a socket already listening on destination (see listenOn).
+	if destination.startswith("unix:") or destination.startswith("tcp:"):
+		messages = receiveMessages(destination, shardCount, timeout, listener)
+	else:
+		messages = readMessages(destination, shardCount, timeout)
+	return mergeResults(messages, shardCount)
+#*** END OF collectResults() **************************************************
+
+
+def mergeResults(messages, shardCount, entryCap=5):
+	#messages is {shard: message}. Feeds are reported shard by shard.
+	result = rssMonitor.CheckResult(entryCap)
+	errors = []
+	for shard in range(shardCount):
+		if not shard in messages:
+			errors.append("shard %i never reported" % shard)
+			continue
+		if "error" in messages[shard]:
+			errors.append("shard %i: %s" % (shard, messages[shard]["error"]))
+			continue
+		shardResult = messages[shard]["result"]
+		result.totalTally = result.totalTally + shardResult["totalTally"]
+		result.notModified = result.notModified + shardResult["notModified"]
+		result.bytesSaved = result.bytesSaved + shardResult["bytesSaved"]
+		result.timedOut = result.timedOut + shardResult["timedOut"]
+		result.skipped = result.skipped + shardResult.get("skipped", 0)
+		#(feeds are sharded by url, so duplicates on different shards are
+		#each fetched by their own shard)
+		result.feedCount = result.feedCount + shardResult.get("feedCount", 0)
+		result.duplicates = result.duplicates + shardResult.get("duplicates", 0)
+		result.feedResults.extend([rssMonitor.makeFeedResult(resultJSON) \
+			for resultJSON in shardResult["feedResults"]])
+	return (result, errors)
+#*** END OF mergeResults() ****************************************************
+
+
+def checkMessage(message, shardCount):
+	#raises ValueError unless message is a report mergeResults() can use
+	#from one of shardCount shards: a shard number and either an error or a
+	#result (see runShard), whole and with the right types.
+	if not isinstance(message, dict) or \
+		not isinstance(message.get("shard"), int) or \
+		not 0 <= message["shard"] < shardCount:
+		raise ValueError("no shard number out of %i" % shardCount)
+	if message.get("shardCount", shardCount) != shardCount:
+		raise ValueError("shard %i of %s, not of %i" % (message["shard"], \
+			message["shardCount"], shardCount))
+	if "error" in message:
+		return
+	try:
+		shardResult = message["result"]
+		for key in ("totalTally", "notModified", "bytesSaved", "timedOut", \
+			"skipped", "feedCount", "duplicates"):
+			if not isinstance(shardResult.get(key, 0), int):
+				raise TypeError("%s isn't a number" % key)
+		for resultJSON in shardResult["feedResults"]:
+			rssMonitor.makeFeedResult(resultJSON)
+	except (AttributeError, IndexError, KeyError, TypeError, ValueError) \
+		as error:
+		raise ValueError("shard %i sent a bad result (%s: %s)" % \
+			(message["shard"], type(error).__name__, error))
+#*** END OF checkMessage() ****************************************************
+
+
+def readMessages(directory, shardCount, timeout):
+	#collects (and removes) the shard reports written to directory.
+	messages = {}
+	deadlineAt = time.monotonic() + timeout
+	while len(messages) < shardCount and time.monotonic() < deadlineAt:
+		for shard in range(shardCount):
+			reportPath = path.join(directory, "shard%iof%i.json" % \
+				(shard, shardCount))
+			if shard in messages or not path.exists(reportPath):
+				continue
+			try:
+				with open(reportPath) as report:
+					message = json.load(report)
+				checkMessage(message, shardCount)
+			except (OSError, ValueError) as error:
+				#(it's left to time out like a shard that never reported)
+				logging.error("Bad shard report %s: %s" % (reportPath, error))
+			else:
+				messages[shard] = message
+			os.remove(reportPath)
+		if len(messages) < shardCount:
+			time.sleep(0.1)
+	return messages
+#*** END OF readMessages() ****************************************************
+
+
+def receiveMessages(destination, shardCount, timeout, listener=None):
+	#accepts one message per connection until every shard has reported.
+	if listener is None:
+		listener = listenOn(destination)
+	messages = {}
+	deadlineAt = time.monotonic() + timeout
+	try:
+		while len(messages) < shardCount:
+			remaining = deadlineAt - time.monotonic()
+			if remaining <= 0:
+				break
+			listener.settimeout(remaining)
+			try:
+				connection, _ = listener.accept()
+			except socket.timeout:
+				break
+			with connection, connection.makefile("rb") as stream:
+				connection.settimeout(max(0.1, deadlineAt - time.monotonic()))
+				try:
+					message = json.loads(stream.readline())
+					checkMessage(message, shardCount)
+				except (OSError, ValueError) as error:
+					#(it's left to time out like a shard that never reported)
+					logging.error("Bad shard report: %s" % error)
+					continue
+			messages[message["shard"]] = message
+	finally:
+		listener.close()
+		if destination.startswith("unix:"):
+			os.remove(getSocketAddress(destination))
+	return messages
+#*** END OF receiveMessages() *************************************************
+
+
+def listenOn(destination):
+	#a socket listening on destination ("unix:PATH" or "tcp:HOST:PORT").
+	#(a unix socket left over from a coordinator that crashed is replaced)
+	listener = socket.socket(*getSocketType(destination))
+	address = getSocketAddress(destination)
+	if destination.startswith("unix:") and path.exists(address):
+		os.remove(address)
+	listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+	listener.bind(address)
+	listener.listen(64)
+	return listener
+#*** END OF listenOn() ********************************************************
+
+
+def getSocketType(destination):
+	if destination.startswith("unix:"):
+		return (socket.AF_UNIX, socket.SOCK_STREAM)
+	return (socket.AF_INET, socket.SOCK_STREAM)
+#*** END OF getSocketType() ***************************************************
+
+
+def getSocketAddress(destination):
+	if destination.startswith("unix:"):
+		return destination[len("unix:"):]
+	host, _, port = destination[len("tcp:"):].rpartition(":")
+	return (host, int(port))
+#*** END OF getSocketAddress() ************************************************
+
+
+#>>> RUNNING LOCALLY <<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<
+def runLocal(filePath, shardCount, coordinator="file"):
+	#splits the store if it hasn't been yet, checks every shard in a process
+	#of its own, and collects them through a temporary directory (or, with
+	#coordinator="socket", a unix socket). Returns (CheckResult, errors).
+	if not path.exists(getShardPath(filePath, 0, shardCount)):
+		splitStore(filePath, shardCount)
+
+	with tempfile.TemporaryDirectory(prefix="rssShard-") as directory:
+		destination = directory
+		listener = None
+		if coordinator == "socket":
+			destination = "unix:" + path.join(directory, "coordinator.sock")
+			listener = listenOn(destination)
+
+		context = multiprocessing.get_context("spawn")
+		workers = [context.Process(target=runShard, args=(filePath, shard, \
+			shardCount, destination)) for shard in range(shardCount)]
+		for worker in workers:
+			worker.start()
+		try:
+			return collectResults(destination, shardCount, listener=listener)
+		finally:
+			for worker in workers:
+				worker.join()
+#*** END OF runLocal() ********************************************************
+
+
+if __name__ == "__main__":
+	main()
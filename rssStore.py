@@ -0,0 +1,419 @@
+''' ~*~{O}~*~
+	rssStore.py
+	Comment:
+		Storage backends for feedJSON. rssMonitor.py only ever talks to these
+		through loadJSON(), saveFeedJSON() and getFeedList(), so the feed
+		store can be the original feeds.txt or an SQLite database.
+
+		JSONFeedStore: the feeds.txt format. Every save rewrites the file (via
+			a temporary file, so it's never left half written).
+		SQLiteFeedStore: one row per feedData (kept in WAL mode). Saves only
+			write the feeds which changed since they were loaded.
+		FeedJournal: a write-ahead log of feedData updates made during a run,
+			kept next to the store. See checkFeeds().
+
+	NOTE: loadStore() and saveStore() also keep a binary snapshot of the
+		store ("<store>.snapshot"), which is much quicker to read than the
+		json, and which says when the next feed is due without being read
+		at all (see getNextDue). An SQLite store's snapshot is only that
+		header, since its loads never use the rest.
+
+	NOTE: the backend is picked from the file extension (see getFeedStore).
+		Use migrateStore() to move a feed store from one format to the other.
+'''
+
+import json, marshal, os, sqlite3, stat, sys, tempfile, time
+from os import path
+
+#file extensions which mean "this is an SQLite feed store"
+SQLITE_EXTENSIONS = (".db", ".sqlite", ".sqlite3")
+
+#one store object per path, so SQLite can remember what it loaded.
+openStores = {}
+
+#the most seconds of journal a power cut can take with it. (A killed process
+#loses nothing - every record is flushed as soon as it's written.)
+JOURNAL_SYNC_SECONDS = 1.0
+
+def getFeedStore(filePath):
+	#returns the (cached) store object for filePath.
+	if not filePath in openStores:
+		if filePath.lower().endswith(SQLITE_EXTENSIONS):
+			openStores[filePath] = SQLiteFeedStore(filePath)
+		else:
+			openStores[filePath] = JSONFeedStore(filePath)
+	return openStores[filePath]
+#*** END OF getFeedStore() ****************************************************
+
+
+def loadStore(filePath):
+	#feedJSON from the store at filePath, read from its snapshot if the
+	#snapshot is still up to date. Otherwise the store is loaded and a new
+	#snapshot is written for next time.
+	store = getFeedStore(filePath)
+	if store.snapshotLoads:
+		header, snapshot = readSnapshot(filePath, True)
+		try:
+			if header is not None and header["storeTime"] == \
+				store.getModifiedTime():
+				return marshal.loads(snapshot)
+		except (OSError, EOFError, ValueError, TypeError):
+			#(a missing store is load()'s error to report)
+			pass
+	feedJSON = store.load()
+	writeSnapshot(filePath, feedJSON, store.snapshotLoads)
+	return feedJSON
+#*** END OF loadStore() *******************************************************
+
+
+def saveStore(filePath, feedJSON):
+	#save feedJSON to the store at filePath, and snapshot it.
+	store = getFeedStore(filePath)
+	store.save(feedJSON)
+	writeSnapshot(filePath, feedJSON, store.snapshotLoads)
+#*** END OF saveStore() *******************************************************
+
+
+def getNextDue(filePath):
+	#the "nextCheck" of the feed that's due soonest, going by the snapshot
+	#alone - "" if some feed has never been scheduled, None if the snapshot
+	#is missing or older than the store (so it can't say). nextCheck is
+	#"YYYY-MM-DD HH:MM:SS" local time, so it compares with strftime() of now.
+	header, _ = readSnapshot(filePath)
+	if header is None:
+		return None
+	try:
+		if header["storeTime"] != getFeedStore(filePath).getModifiedTime():
+			return None
+	except OSError:
+		return None
+	return header["nextDue"]
+#*** END OF getNextDue() ******************************************************
+
+
+def migrateStore(sourcePath, destPath):
+	#copy every feed from one store into another, ie. feeds.txt -> feeds.db.
+	#the destination is overwritten. Returns the number of feeds copied.
+	feedJSON = getFeedStore(sourcePath).load()
+	destStore = getFeedStore(destPath)
+	destStore.clear()
+	destStore.save(feedJSON)
+	return len(feedJSON.get("feedList", []))
+#*** END OF migrateStore() ****************************************************
+
+
+#>>> SNAPSHOTS <<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<
+#a snapshot is one line of json (the header) followed by feedJSON in
+#marshal's format. marshal changes between Python versions, so the header
+#says which one wrote it.
+SNAPSHOT_FORMAT = [marshal.version, sys.version_info[0], sys.version_info[1]]
+
+def writeSnapshot(filePath, feedJSON, withBody=True):
+	#snapshots can always be rebuilt, so failing to write one isn't an error.
+	#without withBody only the header is written, for stores which never
+	#load from the snapshot (see snapshotLoads) but still want getNextDue().
+	nextChecks = [feedData.get("nextCheck", "") for feedData \
+		in feedJSON.get("feedList", [])]
+	tempPath = None
+	try:
+		header = {"format": SNAPSHOT_FORMAT, "nextDue": min(nextChecks, \
+			default=None), "storeTime": getFeedStore(filePath).getModifiedTime()}
+		directory = path.dirname(path.abspath(filePath))
+		handle, tempPath = tempfile.mkstemp(prefix=".snapshot-", dir=directory)
+		with os.fdopen(handle, 'wb') as snapshot:
+			snapshot.write(json.dumps(header).encode("utf-8") + b"\n")
+			if withBody:
+				snapshot.write(marshal.dumps(feedJSON))
+		os.replace(tempPath, filePath + ".snapshot")
+	except (OSError, ValueError):
+		#(don't leave the half written one behind)
+		if tempPath is not None and path.exists(tempPath):
+			try:
+				os.remove(tempPath)
+			except OSError:
+				pass
+#*** END OF writeSnapshot() ***************************************************
+
+
+def readSnapshot(filePath, withBody=False):
+	#(header, body) of filePath's snapshot, body only if withBody.
+	#(None, None) if there isn't a usable one.
+	try:
+		with open(filePath + ".snapshot", 'rb') as snapshot:
+			header = json.loads(snapshot.readline())
+			body = snapshot.read() if withBody else None
+	except (OSError, ValueError):
+		return (None, None)
+	if header.get("format") != SNAPSHOT_FORMAT:
+		return (None, None)
+	return (header, body)
+#*** END OF readSnapshot() ****************************************************
+
+
+#>>> JSON (feeds.txt) <<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<
+class JSONFeedStore:
+	#the whole of feedJSON, as one json document.
+	snapshotLoads = True
+
+	def __init__(self, filePath):
+		self.filePath = filePath
+
+	def load(self):
+		#It will throw an error if it cannot load the file.
+		try:
+			with open(self.filePath, 'r') as store:
+				feedJSON = json.load(store)
+		except FileNotFoundError:
+			raise RuntimeError("Couldn't find feeds.txt!")
+		except ValueError as error:
+			raise RuntimeError("Bad JSON: %s" % str(error))
+		else:
+			return feedJSON
+
+	def save(self, feedJSON):
+		#write a temporary file next to feeds.txt, get it onto the disk, then
+		#rename it over the old one. A crash at any point leaves either the
+		#old file or the new one, never half of one.
+		directory = path.dirname(path.abspath(self.filePath))
+		handle, tempPath = tempfile.mkstemp(prefix=".feeds-", suffix=".tmp", \
+			dir=directory)
+		try:
+			with os.fdopen(handle, 'w') as store:
+				json.dump(feedJSON,store, sort_keys=True, indent=4, \
+					separators=(',', ': '))
+				store.flush()
+				os.fsync(store.fileno())
+			if path.exists(self.filePath):
+				os.chmod(tempPath, stat.S_IMODE(os.stat(self.filePath).st_mode))
+			os.replace(tempPath, self.filePath)
+		except BaseException:
+			if path.exists(tempPath):
+				os.remove(tempPath)
+			raise
+		syncDirectory(directory)
+
+	def clear(self):
+		#nothing to do - save() always rewrites the whole file.
+		pass
+
+	def getModifiedTime(self):
+		return path.getmtime(self.filePath)
+
+	def getFeedList(self, feedClass=None, urgency=None):
+		feedList = self.load()["feedList"]
+		return [feedData for feedData in feedList \
+			if (feedClass is None or feedData.get("class") == feedClass) \
+			and (urgency is None or feedData.get("urgency") == urgency)]
+#*** END OF JSONFeedStore *****************************************************
+
+
+def syncDirectory(directory):
+	#make a rename in directory stick. Not every platform can open a
+	#directory (ie. Windows), in which case there's nothing to be done.
+	try:
+		handle = os.open(directory, os.O_RDONLY)
+	except OSError:
+		return
+	try:
+		os.fsync(handle)
+	except OSError:
+		pass
+	finally:
+		os.close(handle)
+#*** END OF syncDirectory() ***************************************************
+
+
+#>>> SQLITE <<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<
+class SQLiteFeedStore:
+	#feedJSON split into a "meta" table (everything except feedList) and a
+	#"feeds" table with one row per feedData. "pos" keeps the feedList order,
+	#and url/class/urgency are copied into their own indexed columns so they
+	#can be looked up without unpacking every row.
+	#(loads skip the snapshot - save() needs to know what was loaded.)
+	snapshotLoads = False
+	SCHEMA = '''
+		CREATE TABLE IF NOT EXISTS meta (
+			key TEXT PRIMARY KEY,
+			value TEXT NOT NULL);
+		CREATE TABLE IF NOT EXISTS feeds (
+			pos INTEGER PRIMARY KEY,
+			url TEXT NOT NULL,
+			class TEXT,
+			urgency INTEGER,
+			data TEXT NOT NULL);
+		CREATE INDEX IF NOT EXISTS feeds_url ON feeds (url);
+		CREATE INDEX IF NOT EXISTS feeds_class ON feeds (class);
+		CREATE INDEX IF NOT EXISTS feeds_urgency ON feeds (urgency);
+	'''
+
+	def __init__(self, filePath):
+		self.filePath = filePath
+		#serialized rows as of the last load/save, by pos. Anything that
+		#still matches doesn't need writing again.
+		self.savedRows = {}
+		self.savedMeta = {}
+
+	def connect(self, create=False):
+		if not create and not path.exists(self.filePath):
+			raise RuntimeError("Couldn't find %s!" % path.basename(self.filePath))
+		try:
+			connection = sqlite3.connect(self.filePath)
+			connection.execute("PRAGMA journal_mode=WAL")
+			connection.executescript(self.SCHEMA)
+		except sqlite3.DatabaseError as error:
+			raise RuntimeError("Bad feed store: %s" % str(error))
+		return connection
+
+	def load(self):
+		connection = self.connect()
+		try:
+			feedJSON = {}
+			self.savedMeta = {}
+			for key, value in connection.execute("SELECT key, value FROM meta"):
+				feedJSON[key] = json.loads(value)
+				self.savedMeta[key] = value
+
+			feedJSON["feedList"] = []
+			self.savedRows = {}
+			for pos, data in connection.execute( \
+				"SELECT pos, data FROM feeds ORDER BY pos"):
+				#pos should run 0, 1, 2... but don't count on it.
+				self.savedRows[len(feedJSON["feedList"])] = \
+					data if pos == len(feedJSON["feedList"]) else None
+				feedJSON["feedList"].append(json.loads(data))
+		except (sqlite3.DatabaseError, ValueError) as error:
+			raise RuntimeError("Bad feed store: %s" % str(error))
+		finally:
+			connection.close()
+		return feedJSON
+
+	def save(self, feedJSON):
+		#upsert only the rows and meta keys that changed, then drop any rows
+		#past the end of feedList. It all happens in one transaction.
+		feedList = feedJSON.get("feedList", [])
+		connection = self.connect(True)
+		try:
+			with connection:
+				for key, value in feedJSON.items():
+					if key == "feedList":
+						continue
+					value = json.dumps(value, sort_keys=True)
+					if self.savedMeta.get(key) != value:
+						connection.execute("INSERT OR REPLACE INTO meta " \
+							"(key, value) VALUES (?, ?)", (key, value))
+				for key in set(self.savedMeta) - set(feedJSON):
+					connection.execute("DELETE FROM meta WHERE key = ?", (key,))
+
+				for pos, feedData in enumerate(feedList):
+					data = json.dumps(feedData, sort_keys=True)
+					if self.savedRows.get(pos) != data:
+						connection.execute("INSERT OR REPLACE INTO feeds " \
+							"(pos, url, class, urgency, data) " \
+							"VALUES (?, ?, ?, ?, ?)", (pos, \
+							feedData.get("url", ""), feedData.get("class"), \
+							feedData.get("urgency"), data))
+						self.savedRows[pos] = data
+				connection.execute("DELETE FROM feeds WHERE pos >= ?", \
+					(len(feedList),))
+		finally:
+			connection.close()
+
+		for pos in [pos for pos in self.savedRows if pos >= len(feedList)]:
+			del self.savedRows[pos]
+		self.savedMeta = {key: json.dumps(value, sort_keys=True) \
+			for key, value in feedJSON.items() if key != "feedList"}
+
+	def clear(self):
+		#empty the store, forgetting anything loaded from it.
+		connection = self.connect(True)
+		try:
+			with connection:
+				connection.execute("DELETE FROM meta")
+				connection.execute("DELETE FROM feeds")
+		finally:
+			connection.close()
+		self.savedRows = {}
+		self.savedMeta = {}
+
+	def getModifiedTime(self):
+		#in WAL mode a write may only touch the -wal file until checkpoint.
+		walPath = self.filePath + "-wal"
+		if path.exists(walPath):
+			return max(path.getmtime(self.filePath), path.getmtime(walPath))
+		return path.getmtime(self.filePath)
+
+	def getFeedList(self, feedClass=None, urgency=None):
+		#uses the class/urgency indexes instead of loading every feed.
+		query = "SELECT data FROM feeds WHERE 1"
+		arguments = []
+		if feedClass is not None:
+			query = query + " AND class = ?"
+			arguments.append(feedClass)
+		if urgency is not None:
+			query = query + " AND urgency = ?"
+			arguments.append(urgency)
+		connection = self.connect()
+		try:
+			return [json.loads(data) for (data,) in \
+				connection.execute(query + " ORDER BY pos", arguments)]
+		finally:
+			connection.close()
+#*** END OF SQLiteFeedStore ***************************************************
+
+
+#>>> JOURNAL <<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<
+class FeedJournal:
+	#a write-ahead log for a feed store, kept at "<store>.journal" with one
+	#json record per line. A run appends each feed's record as soon as the
+	#feed is checked and remove()s the journal once the store itself has
+	#been saved, so a journal that's still there means a run died part way
+	#through and replay() can pick up where it left off.
+	def __init__(self, storePath):
+		self.filePath = storePath + ".journal"
+		self.journal = None
+		self.lastSync = 0.0
+
+	def replay(self):
+		#every complete record, oldest first ([] if there's no journal). A
+		#torn last line (the run died mid-write) is cut off the file so new
+		#records don't get glued onto it.
+		try:
+			with open(self.filePath, 'rb') as journal:
+				lines = journal.readlines()
+		except FileNotFoundError:
+			return []
+		records = []
+		length = 0
+		for line in lines:
+			try:
+				if not line.endswith(b"\n"):
+					raise ValueError("torn record")
+				records.append(json.loads(line))
+			except ValueError:
+				with open(self.filePath, 'r+b') as journal:
+					journal.truncate(length)
+				break
+			length = length + len(line)
+		return records
+
+	def append(self, record):
+		if self.journal is None:
+			self.journal = open(self.filePath, 'a', encoding="utf-8")
+		self.journal.write(json.dumps(record, sort_keys=True) + "\n")
+		self.journal.flush()
+		if time.monotonic() - self.lastSync >= JOURNAL_SYNC_SECONDS:
+			os.fsync(self.journal.fileno())
+			self.lastSync = time.monotonic()
+
+	def close(self):
+		if self.journal is not None:
+			os.fsync(self.journal.fileno())
+			self.journal.close()
+			self.journal = None
+
+	def remove(self):
+		#the store has everything now - start the next run with a clean slate.
+		self.close()
+		if path.exists(self.filePath):
+			os.remove(self.filePath)
+#*** END OF FeedJournal *******************************************************